@@ -11,6 +11,7 @@ import numpy as np
 
 from transmissor import Transmissor
 from receptor import Receiver as Receptor
+from bits import bits_to_str
 
 
 class Window(QMainWindow):
@@ -87,10 +88,16 @@ class Window(QMainWindow):
         self.radio_nrz = QRadioButton("NRZ")
         self.radio_manchester = QRadioButton("Manchester")
         self.radio_bipolar = QRadioButton("Bipolar")
+        self.radio_4b5b = QRadioButton("4B/5B")
+        self.radio_8b10b = QRadioButton("8B/10B")
+        self.radio_nrzi = QRadioButton("NRZI embaralhado")
         self.radio_nrz.setChecked(True)  # Set default selection
         self.radio_layout.addWidget(self.radio_nrz)
         self.radio_layout.addWidget(self.radio_manchester)
         self.radio_layout.addWidget(self.radio_bipolar)
+        self.radio_layout.addWidget(self.radio_4b5b)
+        self.radio_layout.addWidget(self.radio_8b10b)
+        self.radio_layout.addWidget(self.radio_nrzi)
         self.radio_group_box.setLayout(self.radio_layout)
         self.transmissor_layout.addWidget(self.radio_group_box)
 
@@ -203,11 +210,13 @@ class Window(QMainWindow):
         self.radio_corr1 = QRadioButton("Bit de Paridade Par")
         self.radio_corr2 = QRadioButton("CRC32")
         self.radio_corr3 = QRadioButton("Hamming")
+        self.radio_corr4 = QRadioButton("Paridade 2D")
         self.radio_corr1.setChecked(True)  # Set default selection
         corr_radio_layout2.addWidget(detection_label)
         corr_radio_layout2.addWidget(self.radio_corr1)
         corr_radio_layout2.addWidget(self.radio_corr2)
         corr_radio_layout2.addWidget(self.radio_corr3)
+        corr_radio_layout2.addWidget(self.radio_corr4)
         corr_radio_group_box2.setLayout(corr_radio_layout2)
         self.enlace_layout.addWidget(corr_radio_group_box2)
 
@@ -401,6 +410,12 @@ class Window(QMainWindow):
             self.encoding = "Manchester"
         elif self.radio_bipolar.isChecked():
             self.encoding = "Bipolar"
+        elif self.radio_4b5b.isChecked():
+            self.encoding = "4B5B"
+        elif self.radio_8b10b.isChecked():
+            self.encoding = "8B10B"
+        elif self.radio_nrzi.isChecked():
+            self.encoding = "Scrambled_NRZI"
 
             # Plot modulated data
         if (self.radio_ask.isChecked()):
@@ -425,6 +440,8 @@ class Window(QMainWindow):
             self.error_detection = "crc"
         elif (self.radio_corr3.isChecked()):
             self.error_detection = "hamming"
+        elif (self.radio_corr4.isChecked()):
+            self.error_detection = "parity_2d"
 
         # Create a Transmissor object and perform transmission
         transmissor = Transmissor(text)
@@ -433,8 +450,9 @@ class Window(QMainWindow):
         result = transmissor.run(self.encoding, self.framing,
                                  self.error_detection, self.modulation)
 
+        mensagem = self.receptor.receive(timeout=5)  # message sent by this transmission
         self.receivedMessageRaw, self.receivedMessageBits, self.receivedMessageText = self.receptor.run(
-            self.encoding, self.framing, self.error_detection)
+            self.encoding, self.framing, self.error_detection, bits=mensagem.bits)
 
         if self.radio_8qam.isChecked():
             self.bit_array = result[0]
@@ -452,8 +470,10 @@ class Window(QMainWindow):
 
         self.plot_data(self.encoded_bits)
 
-        self.bitsream = ''.join([str(c) for c in self.bit_array])
-        self.transmitted_data = ''.join([str(c) for c in self.encoded_bits])
+        self.bitsream = bits_to_str(self.bit_array)
+        self.transmitted_data = bits_to_str(self.encoded_bits)
+        self.receivedMessageRaw = bits_to_str(self.receivedMessageRaw)
+        self.receivedMessageBits = bits_to_str(self.receivedMessageBits)
 
         transmissor_text_edit_str = f"""
         <p style='text-align: justify; font-size: 14pt;'>
@@ -0,0 +1,69 @@
+""" Benchmark of the table driven CRC32 (crc.py) against the old bit string long division, and of the batched
+CRC of many frames (crc32_frames) against one crc32_bits call per frame (the round trips are in tests/test_crc.py)
+
+Run from the repository root: python benchmarks/bench_crc.py
+"""
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from crc import crc32_bits, crc32_frames
+
+
+def crc32_bit_string(bit_array):
+    """ Old implementation: polynomial division with string xor, one bit at a time """
+    crc32_polynomial_str = f"{0x104C11DB7:033b}"
+
+    def xor(bit_str_a, bit_str_b):
+        return ''.join('0' if a == b else '1' for a, b in zip(bit_str_a, bit_str_b))
+
+    bit_str = ''.join(map(str, bit_array)) + '0'*32
+    bit_str_to_xor = ''
+    for i in range(len(bit_str)):
+        if i <= 32:
+            bit_str_to_xor += bit_str[i]
+        else:
+            if bit_str_to_xor[0] == '1':
+                bit_str_to_xor = xor(bit_str_to_xor, crc32_polynomial_str)
+            bit_str_to_xor = bit_str_to_xor[1:] + bit_str[i]
+
+        if i == len(bit_str) - 1:
+            if bit_str_to_xor[0] == '1':
+                bit_str_to_xor = xor(bit_str_to_xor, crc32_polynomial_str)
+            bit_str_to_xor = bit_str_to_xor[1:]
+
+    return int(bit_str_to_xor, 2)
+
+
+def main():
+    rng = np.random.default_rng(0)
+
+    for n_bytes in (8, 64, 512, 4096):
+        bits = rng.integers(0, 2, n_bytes * 8, dtype=np.uint8)
+        bits_list = bits.tolist()
+
+        assert crc32_bits(bits) == crc32_bit_string(bits_list), "table CRC differs from the old CRC"
+
+        number = max(1, 4096 // n_bytes)
+        t_old = timeit.timeit(lambda: crc32_bit_string(bits_list), number=number) / number
+        t_new = timeit.timeit(lambda: crc32_bits(bits), number=number * 10) / (number * 10)
+
+        print(f"{n_bytes:6d} bytes | old {t_old*1e3:9.3f} ms | table {t_new*1e3:8.4f} ms | {t_old/t_new:8.1f}x")
+
+    for n_frames, frame_bytes in ((1000, 8), (1000, 256), (100, 4096)):
+        frames = list(rng.integers(0, 2, (n_frames, frame_bytes * 8), dtype=np.uint8))
+
+        assert (crc32_frames(frames) == [crc32_bits(frame) for frame in frames]).all(), "batched CRC differs"
+
+        t_loop = timeit.timeit(lambda: [crc32_bits(frame) for frame in frames], number=3) / 3
+        t_batch = timeit.timeit(lambda: crc32_frames(frames), number=3) / 3
+
+        print(f"{n_frames:5d} x {frame_bytes:4d} bytes | per frame {t_loop*1e3:8.2f} ms | batch {t_batch*1e3:8.2f} ms | {t_loop/t_batch:6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+""" Scaling of the character count, byte insertion and bit insertion framers/deframers with the payload size
+
+Run from the repository root: python benchmarks/bench_deframing.py
+The time per MB should stay flat as the payload grows (linear scaling).
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from transmissor import Transmissor
+from receptor import Receiver
+from bits import concat_bits
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    rng = np.random.default_rng(0)
+    transmissor = Transmissor("")
+    receiver = Receiver()
+    max_frame_size = 254 # the deframer input gets one padding byte more, so the 8 bit count stays <= 255
+
+    print(f"{'framing':16s} {'MB':>5s} {'frames':>9s} {'framing s':>10s} {'deframing s':>12s} {'s/MB':>8s}")
+    for size_mb in (1, 2, 4, 8, 16, 32):
+        data = rng.integers(0, 256, size_mb << 20, dtype=np.uint8)
+        bits = np.unpackbits(data)
+
+        for name, framing, deframing in (("character_count", transmissor.character_count_framing, receiver.character_count_deframing),
+                                         ("byte_insertion", transmissor.bytes_insertion_framing, receiver.bytes_insertion_deframing)):
+            frames, t_framing = timed(framing, bits, max_frame_size)
+            if name == "character_count": # the deframer expects the padding header added by adjust_frames_*
+                stream = concat_bits(np.concatenate((np.unpackbits(np.array([len(frame) // 8 + 1, 0], dtype=np.uint8)), frame[8:])) for frame in frames)
+            else: # padding header, then the escapes of the flag/escape bytes of the data
+                stream = concat_bits(transmissor.byte_stuffing_frame(np.concatenate((frame[:8], np.zeros(8, dtype=np.uint8), frame[8:]))) for frame in frames)
+
+            (deframed, _), t_deframing = timed(deframing, stream)
+            assert np.array_equal(concat_bits(deframed), bits), f"{name} deframing lost data"
+
+            print(f"{name:16s} {size_mb:5d} {len(frames):9d} {t_framing:10.3f} {t_deframing:12.3f} {(t_framing + t_deframing) / size_mb:8.3f}")
+
+        frames, t_framing = timed(lambda: [transmissor.bit_stuffing_frame(frame) for frame in transmissor.bits_insertion_framing(bits, 2048)])
+        (deframed, _), t_deframing = timed(receiver.bits_insertion_deframing, concat_bits(frames))
+        assert np.array_equal(concat_bits(deframed), bits), "bits_insertion deframing lost data"
+
+        print(f"{'bits_insertion':16s} {size_mb:5d} {len(frames):9d} {t_framing:10.3f} {t_deframing:12.3f} {(t_framing + t_deframing) / size_mb:8.3f}")
+
+
+if __name__ == '__main__':
+    main()
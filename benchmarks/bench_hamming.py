@@ -0,0 +1,45 @@
+""" Benchmark of the block Hamming codes (hamming.py): encoding and decoding throughput, one error per block
+
+Run from the repository root: python benchmarks/bench_hamming.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from hamming import HAMMING_CODES
+
+
+def main():
+    rng = np.random.default_rng(0)
+    frame_bits = 2048
+
+    for n_bytes in (1 << 16, 1 << 20):
+        bits = rng.integers(0, 2, n_bytes * 8, dtype=np.uint8)
+        frames = np.split(bits, range(frame_bits, len(bits), frame_bits))
+
+        for name, code in HAMMING_CODES.items():
+            start = time.perf_counter()
+            coded_frames = [code.encode(frame) for frame in frames]
+            t_encode = time.perf_counter() - start
+
+            for coded in coded_frames: # one error in every full block
+                full_blocks = len(coded) // code.n
+                coded[np.arange(full_blocks) * code.n + rng.integers(0, code.n, full_blocks)] ^= 1
+
+            start = time.perf_counter()
+            decoded_frames, errors = code.decode_frames(coded_frames)
+            t_decode = time.perf_counter() - start
+
+            assert np.array_equal(np.concatenate(decoded_frames), bits), "errors were not corrected"
+            assert all(errors)
+
+            mb = n_bytes / 2**20
+            print(f"{mb:6.2f} MB | ({name:>5}) | encode {mb/t_encode:8.2f} MB/s | decode {mb/t_decode:8.2f} MB/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+""" Benchmark of the line coders: throughput of the coder and decoder and bits on the line per data bit
+
+Run from the repository root: python benchmarks/bench_line_codes.py
+"""
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from transmissor import Transmissor
+from receptor import Receiver
+from line_codes import decode_4b5b, decode_8b10b, decode_scrambled_nrzi
+
+
+def main():
+    rng = np.random.default_rng(0)
+    bits = rng.integers(0, 2, 8 << 20, dtype=np.uint8) # 1 MB
+    transmissor = Transmissor("")
+    receiver = Receiver()
+
+    line_codes = {
+        "nrz": (transmissor.polar_nrz_coder, receiver.polar_nrz_decoder),
+        "manchester": (transmissor.manchester_coder, receiver.manchester_decoder),
+        "bipolar": (lambda bits: transmissor.bipolar_pairs[transmissor.bipolar_coder(bits) + 1].view(np.uint8), # 2 bits per AMI level on the link
+                    lambda pairs: receiver.bipolar_decoder(receiver.bipolar_levels(pairs)[0])),
+        "4b5b": (transmissor.block_4b5b_coder, decode_4b5b),
+        "8b10b": (transmissor.block_8b10b_coder, decode_8b10b),
+        "scrambled_nrzi": (transmissor.scrambled_nrzi_coder, decode_scrambled_nrzi),
+    }
+    t_copy = timeit.timeit(bits.copy, number=5) / 5
+    print(f"{'memcpy':>14} | {t_copy*1e3:7.2f} ms")
+
+    for name, (coder, decoder) in line_codes.items():
+        coded = coder(bits)
+        assert np.array_equal(decoder(coded)[:len(bits)], bits), f"{name} round trip failed"
+
+        t_code = timeit.timeit(lambda: coder(bits), number=5) / 5
+        t_decode = timeit.timeit(lambda: decoder(coded), number=5) / 5
+        print(f"{name:>14} | code {t_code*1e3:7.2f} ms | decode {t_decode*1e3:7.2f} ms | {len(coded)/len(bits):.2f} line bits per bit")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+""" Benchmark of the batched even parity and of the 2-D parity (parity.py) against the Hamming codes
+
+Run from the repository root: python benchmarks/bench_parity.py
+"""
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from parity import even_parity_frames, parity_2d_encode_frames, parity_2d_decode_frames
+from hamming import HAMMING_CODES
+
+
+def even_parity_per_frame(frames):
+    """ Old implementation: one sum per frame """
+    return [int(frame.sum()) % 2 for frame in frames]
+
+
+def main():
+    rng = np.random.default_rng(0)
+
+    for n_frames, frame_bytes in ((10000, 8), (1000, 256)):
+        frames = list(rng.integers(0, 2, (n_frames, frame_bytes * 8), dtype=np.uint8))
+        assert even_parity_frames(frames).tolist() == even_parity_per_frame(frames), "batched parity differs"
+
+        t_loop = timeit.timeit(lambda: even_parity_per_frame(frames), number=3) / 3
+        t_batch = timeit.timeit(lambda: even_parity_frames(frames), number=3) / 3
+        print(f"even parity {n_frames:5d} x {frame_bytes:3d} bytes | per frame {t_loop*1e3:7.2f} ms | batch {t_batch*1e3:7.2f} ms | {t_loop/t_batch:5.1f}x")
+
+        coded = parity_2d_encode_frames(frames)
+        for frame in coded: # one error per frame
+            frame[rng.integers(len(frame))] ^= 1
+        assert all(np.array_equal(a, b) for a, b in zip(parity_2d_decode_frames(coded)[0], frames)), "2-D parity didn't correct"
+
+        t_encode = timeit.timeit(lambda: parity_2d_encode_frames(frames), number=3) / 3
+        t_decode = timeit.timeit(lambda: parity_2d_decode_frames(coded), number=3) / 3
+        overhead = sum(map(len, coded)) / (n_frames * frame_bytes * 8) - 1
+        print(f"parity_2d   {n_frames:5d} x {frame_bytes:3d} bytes | encode {t_encode*1e3:7.2f} ms | decode {t_decode*1e3:7.2f} ms | overhead {overhead:6.1%}")
+
+        for name, code in HAMMING_CODES.items():
+            t_encode = timeit.timeit(lambda: [code.encode(frame) for frame in frames], number=3) / 3
+            overhead = code.n / code.k - 1
+            print(f"hamming {name:>5} {n_frames:5d} x {frame_bytes:3d} bytes | encode {t_encode*1e3:7.2f} ms | overhead {overhead:6.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+""" Benchmark suite: every encoding x framing x error correction/detection x modulation over a range of payload sizes
+
+For each configuration and payload size it times Transmissor.run and Receiver.run (best of --repeat runs),
+measures the peak memory of every stage with tracemalloc in a separate run, and checks that the receiver gets the
+payload back. Results are saved as JSON and can be compared with a saved baseline.
+
+Run from the repository root:
+    python benchmarks/bench_suite.py --sizes 1,1024,65536 --output results.json
+    python benchmarks/bench_suite.py --sizes 1,1024,65536 --baseline results.json
+    python benchmarks/bench_suite.py --encodings nrz --edcs crc --sizes 10485760 --frame-size 4096 --no-memory
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import protocol
+from transmissor import Transmissor
+from receptor import Receiver
+
+
+DEFAULT_SIZES = [1, 1024, 65536] # bytes; up to 10 MB with --sizes
+MAX_MODULATED_BYTES = 65536 # the waveforms take 100 samples per bit, bigger payloads stop at the link layer
+
+
+def parse_list(text, known):
+    names = list(known) if text == "all" else text.split(",")
+    unknown = [name for name in names if name not in known]
+    if unknown:
+        raise SystemExit(f"unknown: {', '.join(unknown)} (choose from {', '.join(known)})")
+    return names
+
+
+def run_once(config, payload, modulate, frame_size=None, trace_memory=False):
+    """ (transmissor stats, receiver stats, round trip ok) of one Transmissor -> Receiver run """
+    encoding_method, framing_method, error_correction_or_detection_method, modulation_method = config
+    transmissor = Transmissor(payload)
+    transmissor.run(encoding_method, framing_method, error_correction_or_detection_method, modulation_method if modulate else None,
+                    send=False, frame_size=frame_size, count_header_bytes=2, trace_memory=trace_memory)
+
+    receiver = Receiver()
+    if modulate:
+        receiver.run(encoding_method, framing_method, error_correction_or_detection_method, modulation_method, signal=transmissor.signal,
+                     num_bits=len(transmissor.bits_vector), count_header_bytes=2, trace_memory=trace_memory)
+    else:
+        receiver.run(encoding_method, framing_method, error_correction_or_detection_method, bits=transmissor.bits_vector,
+                     count_header_bytes=2, trace_memory=trace_memory)
+
+    ok = np.array_equal(receiver.bits_cleaned, transmissor.bit_array) and not any(receiver.list_error_detec) and receiver.line_code_violations == 0
+    return transmissor.run_stats, receiver.run_stats, ok
+
+
+def stage_times(run_stats):
+    return {stage.name: stage.wall_seconds for stage in run_stats.stages}
+
+
+def benchmark(config, payload, repeat, frame_size=None, trace_memory=True):
+    """ Best wall time of repeat runs for each side and stage, then one traced run for the peak memory """
+    modulate = len(payload) <= MAX_MODULATED_BYTES
+    best = {"transmissor": {}, "receiver": {}}
+    ok = True
+
+    for _ in range(repeat):
+        tx_stats, rx_stats, run_ok = run_once(config, payload, modulate, frame_size)
+        ok &= run_ok
+        for side, run_stats in (("transmissor", tx_stats), ("receiver", rx_stats)):
+            for name, seconds in stage_times(run_stats).items():
+                best[side][name] = min(best[side].get(name, seconds), seconds)
+
+    if trace_memory: # tracemalloc slows the run down, so it doesn't go in the timings
+        tx_stats, rx_stats, run_ok = run_once(config, payload, modulate, frame_size, trace_memory=True)
+        ok &= run_ok
+    payload_bits = len(payload) * 8
+    result = {"config": list(config), "payload_bytes": len(payload), "frame_size": frame_size, "modulated": modulate, "ok": bool(ok)}
+
+    for side, run_stats in (("transmissor", tx_stats), ("receiver", rx_stats)):
+        wall = sum(best[side].values())
+        result[side] = {
+            "wall_seconds": wall,
+            "bits_per_second": payload_bits / wall if wall > 0 else None,
+            "stages": {stage.name: {"wall_seconds": best[side][stage.name], "peak_bytes": stage.peak_bytes,
+                                    "bits_in": stage.bits_in, "bits_out": stage.bits_out} for stage in run_stats.stages},
+        }
+    result["wall_seconds"] = result["transmissor"]["wall_seconds"] + result["receiver"]["wall_seconds"]
+    return result
+
+
+def result_key(result):
+    return (tuple(result["config"]), result["payload_bytes"], result.get("frame_size"))
+
+
+def compare(results, baseline, threshold):
+    """ Prints the time ratio to the baseline for every result in both runs, returns the regressions """
+    baseline_results = {result_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = baseline_results.get(result_key(result))
+        if old is None or not old["wall_seconds"]:
+            continue
+        ratio = result["wall_seconds"] / old["wall_seconds"]
+        slower_stages = [f"{side}.{name} {stage['wall_seconds'] / old[side]['stages'][name]['wall_seconds']:.2f}x"
+                         for side in ("transmissor", "receiver") for name, stage in result[side]["stages"].items()
+                         if name in old[side]["stages"] and old[side]["stages"][name]["wall_seconds"] > 0
+                         and stage["wall_seconds"] / old[side]["stages"][name]["wall_seconds"] > threshold]
+        if ratio > threshold:
+            regressions.append((result, ratio))
+            print(f"REGRESSION {'/'.join(result['config']):<50} {result['payload_bytes']:>9} B {ratio:6.2f}x  {', '.join(slower_stages)}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--encodings", default="all")
+    parser.add_argument("--framings", default="all")
+    parser.add_argument("--edcs", default="all")
+    parser.add_argument("--modulations", default="all")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="payload sizes in bytes, comma separated (1 B to 10 MB)")
+    parser.add_argument("--frame-size", type=int, help="frame size passed to Transmissor.run (bytes, bits for bits_insertion); large payloads need large frames")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run (slow with many frames)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per point, the best one is kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON file for the results")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    encodings = parse_list(args.encodings, protocol.ENCODING_IDS)
+    framings = parse_list(args.framings, protocol.FRAMING_IDS)
+    edcs = parse_list(args.edcs, protocol.ERROR_CORRECTION_OR_DETECTION_IDS)
+    modulations = parse_list(args.modulations, protocol.MODULATION_IDS)
+    sizes = [int(size) for size in args.sizes.split(",")]
+    rng = np.random.default_rng(args.seed)
+    payloads = {size: rng.integers(0x20, 0x7F, size, dtype=np.uint8).tobytes() for size in sizes} # printable ascii
+
+    results = []
+    for size in sizes:
+        # above MAX_MODULATED_BYTES the modulation is skipped, so every modulation would give the same run
+        size_modulations = modulations if size <= MAX_MODULATED_BYTES else modulations[:1]
+        for config in ((e, f, d, m) for e in encodings for f in framings for d in edcs for m in size_modulations):
+            result = benchmark(config, payloads[size], args.repeat, args.frame_size, not args.no_memory)
+            results.append(result)
+            tx, rx = result["transmissor"], result["receiver"]
+            print(f"{'/'.join(config):<50} {size:>9} B | tx {tx['wall_seconds']*1e3:9.2f} ms {tx['bits_per_second']/1e6:8.2f} Mb/s"
+                  f" | rx {rx['wall_seconds']*1e3:9.2f} ms {rx['bits_per_second']/1e6:8.2f} Mb/s | {'ok' if result['ok'] else 'ROUND TRIP FAILED'}")
+
+    report = {
+        "meta": {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(), "numpy": np.__version__,
+                 "platform": platform.platform(), "repeat": args.repeat, "seed": args.seed, "frame_size": args.frame_size},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=1)
+
+    failures = [result for result in results if not result["ok"]]
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.threshold)
+
+    print(f"{len(results)} runs, {len(failures)} round trip failures, {len(regressions)} regressions")
+    return 1 if failures or regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
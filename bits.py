@@ -0,0 +1,109 @@
+import numpy as np
+
+
+def as_bits(data) -> np.ndarray:
+    """ Converts a bit container (list of ints, '0'/'1' string or array) to a uint8 bit array """
+    if isinstance(data, np.ndarray):
+        if data.dtype == np.uint8:
+            return data.ravel()
+        return data.astype(np.uint8).ravel()
+    if isinstance(data, str):
+        return np.frombuffer(data.encode('ascii'), dtype=np.uint8) - ord('0') # '0' -> 0; '1' -> 1
+    return np.asarray(data, dtype=np.uint8).ravel()
+
+
+def bits_to_str(bits) -> str:
+    """ Converts a bit array to a '0'/'1' string (used only for display) """
+    bits = np.asarray(bits)
+    if bits.dtype != np.uint8 or (bits.size and bits.max() > 1): # line coded signals (-1, 0, 1) are shown as they are
+        return ''.join(map(str, bits.tolist()))
+    return (bits + ord('0')).tobytes().decode('ascii')
+
+
+def concat_bits(chunks) -> np.ndarray:
+    """ Concatenates a list of bit arrays (frames) into a single uint8 bit array """
+    chunks = [as_bits(chunk) for chunk in chunks]
+    if not chunks:
+        return np.zeros(0, dtype=np.uint8)
+    return np.concatenate(chunks)
+
+
+def bytes_to_bits(data) -> np.ndarray:
+    """ Converts bytes (or a uint8 array) to a uint8 bit array, 8 bits per byte, MSB first """
+    return np.unpackbits(np.frombuffer(memoryview(data), dtype=np.uint8))
+
+
+def bits_to_bytes(bits) -> bytes:
+    """ Converts a bit array to bytes, the last byte is completed with 0's """
+    return np.packbits(as_bits(bits)).tobytes()
+
+
+def iter_bytes_to_bits(source, chunk_size: int = 1 << 16):
+    """ Yields uint8 bit arrays from bytes or a binary file-like object, chunk_size bytes at a time """
+    if hasattr(source, 'read'):
+        while chunk := source.read(chunk_size):
+            yield bytes_to_bits(chunk)
+    else:
+        view = memoryview(source)
+        for i in range(0, len(view), chunk_size):
+            yield bytes_to_bits(view[i:i+chunk_size])
+
+
+def stream_to_bits(source, chunk_size: int = 1 << 16) -> np.ndarray:
+    """ Converts bytes or a binary file-like object to a single uint8 bit array, reading it in chunks """
+    return concat_bits(iter_bytes_to_bits(source, chunk_size))
+
+
+def write_bits(bits, sink, chunk_size: int = 1 << 16) -> int:
+    """ Writes a bit array as bytes to a binary file-like object in chunks, returns the number of bytes written """
+    bits = as_bits(bits)
+    written = 0
+    for i in range(0, len(bits), chunk_size * 8):
+        written += sink.write(bits_to_bytes(bits[i:i + chunk_size * 8]))
+    return written
+
+
+def window_values(bits, width: int = 8) -> np.ndarray:
+    """ Value of every width-bit window (big-endian), one per start position, used to find flags at any bit offset """
+    bits = as_bits(bits)
+    num_windows = max(len(bits) - width + 1, 0)
+    values = np.zeros(num_windows, dtype=np.uint8 if width <= 8 else np.uint64)
+    for k in range(width):
+        values <<= 1
+        values |= bits[k:k + num_windows]
+    return values
+
+
+def runs_of_ones(bits):
+    """ Returns (starts, lengths) of every run of consecutive 1's """
+    bits = as_bits(bits)
+    edges = np.diff(np.concatenate(([0], bits, [0])).astype(np.int8))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return starts, ends - starts
+
+
+def frames_matrix(frames, width_multiple: int = 1) -> np.ndarray:
+    """ Frames (bit arrays) as the rows of a 2-D uint8 matrix, left padded with zeros to the longest frame
+    (rounded up to width_multiple), so per-frame reductions run over all frames at once """
+    frames = [as_bits(frame) for frame in frames]
+    width = max((len(frame) for frame in frames), default=0)
+    width += -width % width_multiple
+    matrix = np.zeros((len(frames), width), dtype=np.uint8)
+    for row, frame in enumerate(frames):
+        matrix[row, width - len(frame):] = frame
+    return matrix
+
+
+def int_to_bits(value: int, width: int = 8) -> np.ndarray:
+    """ Converts an integer to a big-endian bit array with width bits """
+    shifts = np.arange(width - 1, -1, -1, dtype=np.uint64)
+    return ((np.uint64(value) >> shifts) & np.uint64(1)).astype(np.uint8)
+
+
+def bits_to_int(bits) -> int:
+    """ Converts a big-endian bit array to an integer """
+    value = 0
+    for bit in as_bits(bits).tolist():
+        value = (value << 1) | bit
+    return value
@@ -0,0 +1,71 @@
+import numpy as np
+
+
+class Channel:
+    """ Noisy channel between Transmissor and Receiver, every method works on whole arrays (a signal, a bit
+    vector or a (frames, bits) batch) and draws from one seeded numpy Generator so runs can be repeated """
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed) # seed can be an int, a SeedSequence or an existing Generator
+
+
+    def awgn(self, signal, ebn0_db, num_bits):
+        """ Adds white gaussian noise for the given Eb/N0 (dB)
+
+        Eb is measured from the signal itself: energy of the samples along the last axis divided by num_bits.
+        Complex signals (8-QAM) get noise on both components.
+        """
+        signal = np.asarray(signal)
+        energy = np.sum(np.abs(signal)**2, axis=-1, keepdims=True) # energy of each row of the batch
+        eb = energy / num_bits
+        n0 = eb / 10**(ebn0_db / 10)
+        sigma = np.sqrt(n0 / 2) # noise variance per dimension is N0/2
+
+        if np.iscomplexobj(signal):
+            noise = self.rng.standard_normal(signal.shape) + 1j * self.rng.standard_normal(signal.shape)
+        else:
+            noise = self.rng.standard_normal(signal.shape)
+        return signal + sigma * noise
+
+
+    def binary_symmetric(self, bits, p):
+        """ Flips each bit independently with probability p """
+        bits = np.asarray(bits, dtype=np.uint8)
+        errors = self.rng.random(bits.shape) < p
+        return bits ^ errors.astype(np.uint8)
+
+
+    def gilbert_elliott(self, bits, p_good_to_bad, p_bad_to_good, error_good=0.0, error_bad=0.5):
+        """ Burst errors: a two state Markov chain (good/bad) where each state has its own bit error probability
+
+        The chain runs over the flattened bits, so bursts can cross frame boundaries in a batch.
+        """
+        bits = np.asarray(bits, dtype=np.uint8)
+        bad = self.gilbert_elliott_states(bits.size, p_good_to_bad, p_bad_to_good).reshape(bits.shape)
+        errors = self.rng.random(bits.shape) < np.where(bad, error_bad, error_good)
+        return bits ^ errors.astype(np.uint8)
+
+
+    def gilbert_elliott_states(self, n, p_good_to_bad, p_bad_to_good):
+        """ Returns n states (True = bad) built from geometric sojourn times instead of a per bit loop """
+        if n == 0:
+            return np.zeros(0, dtype=bool)
+        if p_good_to_bad <= 0:
+            return np.zeros(n, dtype=bool) # never leaves the good state
+        if p_bad_to_good <= 0:
+            first_bad = self.rng.geometric(p_good_to_bad)
+            return np.arange(n) >= first_bad # never leaves the bad state
+
+        start_bad = self.rng.random() < p_good_to_bad / (p_good_to_bad + p_bad_to_good) # stationary distribution
+        mean_cycle = 1 / p_good_to_bad + 1 / p_bad_to_good
+        lengths = []
+        total = 0
+        while total < n: # draw (good, bad) run pairs until they cover the n bits
+            num_pairs = int(n / mean_cycle * 1.2) + 8
+            good = self.rng.geometric(p_good_to_bad, num_pairs)
+            bad = self.rng.geometric(p_bad_to_good, num_pairs)
+            pairs = np.column_stack((bad, good) if start_bad else (good, bad)).ravel()
+            lengths.append(pairs)
+            total += int(pairs.sum())
+
+        states = np.tile([start_bad, not start_bad], sum(len(chunk) for chunk in lengths) // 2)
+        return np.repeat(states, np.concatenate(lengths))[:n]
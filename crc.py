@@ -0,0 +1,66 @@
+import numpy as np
+from bits import as_bits, frames_matrix
+
+
+CRC32_POLYNOMIAL = 0x04C11DB7 # polynomial used by CRC32 IEEE 802 (the x^32 term is implicit)
+
+
+def _make_crc32_table(polynomial):
+    """ Precomputes the remainder of each byte value (b * x^32 mod P), MSB first """
+    table = np.zeros(256, dtype=np.uint32)
+    for byte in range(256):
+        crc = byte << 24
+        for _ in range(8):
+            if crc & 0x80000000:
+                crc = ((crc << 1) ^ polynomial) & 0xFFFFFFFF
+            else:
+                crc = (crc << 1) & 0xFFFFFFFF
+        table[byte] = crc
+    return table
+
+
+CRC32_TABLE = _make_crc32_table(CRC32_POLYNOMIAL)
+_CRC32_TABLE_LIST = CRC32_TABLE.tolist() # python ints are faster than numpy scalars in the byte loop
+
+
+def crc32_update_bytes(crc: int, data) -> int:
+    """ Feeds whole bytes to the CRC register, one table lookup per byte """
+    table = _CRC32_TABLE_LIST
+    for byte in bytes(data):
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ table[(crc >> 24) ^ byte]
+    return crc
+
+
+def crc32_update_bits(crc: int, bits) -> int:
+    """ Feeds single bits to the CRC register (used for the bits that don't fill a byte) """
+    for bit in as_bits(bits).tolist():
+        top = (crc >> 31) ^ bit
+        crc = (crc << 1) & 0xFFFFFFFF
+        if top:
+            crc ^= CRC32_POLYNOMIAL
+    return crc
+
+
+def crc32_bits(bits) -> int:
+    """ Remainder of bits * x^32 divided by the CRC32 polynomial (initial value 0, no reflection, no final xor)
+
+    Gives the same result as the long division over bit strings used before, for any number of bits.
+    """
+    bits = as_bits(bits)
+    head = len(bits) % 8 # bits that don't fill a byte are fed first, one by one
+    crc = crc32_update_bits(0, bits[:head])
+    return crc32_update_bytes(crc, np.packbits(bits[head:]).tobytes())
+
+
+def crc32_frames(frames) -> np.ndarray:
+    """ crc32_bits of every frame (list of bit arrays) in one pass, as a uint32 array
+
+    The frames are left padded with zeros to the same whole number of bytes (leading zeros don't change the
+    remainder, the register starts at 0), so the registers of all frames are updated together, one byte column
+    at a time.
+    """
+    matrix = frames_matrix(frames, 8)
+    crc = np.zeros(len(matrix), dtype=np.uint32)
+    for column in np.packbits(matrix, axis=1).T:
+        crc = (crc << 8) ^ CRC32_TABLE[(crc >> 24) ^ column] # uint32 drops the bits shifted out
+    return crc
@@ -0,0 +1,124 @@
+import numpy as np
+from bits import as_bits
+
+
+class HammingCode:
+    """ Systematic Hamming code over GF(2), each block is k data bits followed by r parity bits
+
+    extended adds an overall parity bit to each block (SEC-DED: corrects one error, detects two).
+    A frame is split in blocks of k bits, so a frame corrects one error per block. The last block of a frame is
+    shortened: its missing data bits count as zeros and are not sent.
+    """
+    def __init__(self, k, extended=False):
+        r = 2
+        while 2**r < k + r + 1: # smallest r with a distinct non zero syndrome for each of the k + r bits
+            r += 1
+        self.k = k
+        self.r = r
+        self.extended = extended
+        self.n = k + r + extended
+
+        data_syndromes = [s for s in range(3, 2**r) if s & (s - 1)][:k] # syndromes with two or more ones for the data bits
+        syndromes = np.array(data_syndromes + [1 << i for i in range(r)]) # a single one for the parity bits
+        parity_check = (syndromes[:, None] >> np.arange(r)) & 1 # H transposed, (k + r, r)
+        generator = np.concatenate((np.eye(k, dtype=np.int64), parity_check[:k]), axis=1) # G = [I | P], (k, k + r)
+
+        self.parity_check = parity_check.astype(np.float32) # float matrices go through BLAS, sums stay exact
+        self.generator = generator.astype(np.float32)
+        self.syndrome_weights = (1 << np.arange(r)).astype(np.float32)
+        self.syndrome_table = np.full(2**r, -1, dtype=np.int64) # syndrome -> column of the single error, -1 for none
+        self.syndrome_table[syndromes] = np.arange(k + r)
+
+
+    def encode(self, bits):
+        """ Code words of every block of the frame, concatenated """
+        bits = as_bits(bits)
+        fill = -len(bits) % self.k # zeros that complete the last block, not sent
+        blocks = np.concatenate((bits, np.zeros(fill, dtype=np.uint8))).reshape(-1, self.k)
+
+        code_words = ((blocks @ self.generator) % 2).astype(np.uint8) # every block at once
+        if self.extended:
+            code_words = np.concatenate((code_words, code_words.sum(axis=1, keepdims=True, dtype=np.uint8) & 1), axis=1)
+
+        code_bits = code_words.ravel()
+        if fill:
+            last_block = len(code_bits) - self.n
+            code_bits = np.delete(code_bits, np.arange(last_block + self.k - fill, last_block + self.k))
+        return code_bits
+
+
+    def is_valid_length(self, num_bits):
+        """ True if num_bits is whole blocks plus, maybe, one shortened block (which still has at least one data bit) """
+        tail = num_bits % self.n
+        return tail == 0 or tail > self.n - self.k
+
+
+    def to_blocks(self, bits):
+        """ (blocks, fill): the received frame as a (n_blocks, n) matrix, with the missing data bits of the last block back as zeros """
+        bits = as_bits(bits)
+        tail = len(bits) % self.n
+        fill = self.n - tail if tail else 0
+        if not self.is_valid_length(len(bits)):
+            raise ValueError(f"{len(bits)} bits is not a valid length for a Hamming ({self.n},{self.k}) frame")
+
+        if fill:
+            bits = np.insert(bits, np.full(fill, len(bits) - tail + self.k - fill), 0)
+        return bits.reshape(-1, self.n), fill
+
+
+    def decode_blocks(self, blocks):
+        """ (data blocks, error found, uncorrectable) for a (n_blocks, n) matrix, syndromes of every block at once """
+        syndromes = (((blocks[:, :self.k + self.r] @ self.parity_check) % 2) @ self.syndrome_weights).astype(np.int64)
+        error_columns = self.syndrome_table[syndromes]
+        errors = syndromes != 0
+
+        if self.extended:
+            odd_errors = (blocks.sum(axis=1, dtype=np.int64) & 1) == 1
+            correctable = errors & odd_errors & (error_columns >= 0)
+            errors |= odd_errors # syndrome 0 with odd parity: the overall parity bit itself is wrong
+        else:
+            correctable = error_columns >= 0
+        uncorrectable = errors & ~correctable & (syndromes != 0)
+
+        rows = np.flatnonzero(correctable)
+        data = blocks[:, :self.k].copy()
+        inside_data = error_columns[rows] < self.k # errors on parity bits don't touch the data
+        data[rows[inside_data], error_columns[rows[inside_data]]] ^= 1
+        return data, errors, uncorrectable
+
+
+    def decode(self, bits):
+        """ (data bits, error found) of one frame """
+        data, errors = self.decode_frames([bits])
+        return data[0], errors[0]
+
+
+    def decode_frames(self, frames):
+        """ (data bits of each frame, error found in each frame), the blocks of every frame are decoded together
+
+        A frame whose length was broken by the channel (bits lost or added by the deframing) is flagged and decoded
+        up to its last whole block; the other frames of the batch are decoded as usual.
+        """
+        if not frames:
+            return [], []
+
+        malformed = [not self.is_valid_length(len(frame)) for frame in frames]
+        frames = [frame[:len(frame) // self.n * self.n] if bad else frame for frame, bad in zip(frames, malformed)]
+        blocks, fills = zip(*(self.to_blocks(frame) for frame in frames))
+        data, errors, _ = self.decode_blocks(np.concatenate(blocks))
+        split = np.cumsum([len(frame_blocks) for frame_blocks in blocks])[:-1]
+
+        data_frames = []
+        error_frames = []
+        for frame_data, frame_errors, fill, bad in zip(np.split(data, split), np.split(errors, split), fills, malformed):
+            frame_bits = frame_data.ravel()
+            data_frames.append(frame_bits[:len(frame_bits) - fill])
+            error_frames.append(bool(frame_errors.any()) or bad)
+        return data_frames, error_frames
+
+
+HAMMING_CODES = {
+    "7,4": HammingCode(4),
+    "15,11": HammingCode(11),
+    "72,64": HammingCode(64, extended=True), # shortened (127,120) + overall parity, SEC-DED on 8 data bytes
+}
@@ -0,0 +1,143 @@
+import numpy as np
+from bits import as_bits
+
+
+# 4B/5B ---------------------------------------------------------------------------------------------------------------------
+
+CODES_4B5B = [0b11110, 0b01001, 0b10100, 0b10101, 0b01010, 0b01011, 0b01110, 0b01111,
+              0b10010, 0b10011, 0b10110, 0b10111, 0b11010, 0b11011, 0b11100, 0b11101] # nibble -> 5 bit symbol
+
+
+def _bits_table(values, width):
+    """ Each value as a row of width bits, MSB first """
+    return ((np.asarray(values)[:, None] >> np.arange(width - 1, -1, -1)) & 1).astype(np.uint8)
+
+
+def _pad_to_bytes(bits):
+    """ Completes the coded bits to whole bytes with 1's and 0's, the decoders ignore a last group that isn't complete """
+    return np.concatenate((bits, np.arange(-len(bits) % 8, dtype=np.uint8) % 2 ^ 1))
+
+
+_BYTE_4B5B = np.array([CODES_4B5B[byte >> 4] << 5 | CODES_4B5B[byte & 0xF] for byte in range(256)])
+TABLE_4B5B = _bits_table(_BYTE_4B5B, 10) # byte -> 10 bits (high nibble first)
+DECODE_4B5B = np.zeros(1024, dtype=np.uint8) # 10 bit code -> byte, invalid codes decode to 0
+DECODE_4B5B[_BYTE_4B5B] = np.arange(256)
+
+
+# 8B/10B ---------------------------------------------------------------------------------------------------------------------
+
+CODES_5B6B = [0b100111, 0b011101, 0b101101, 0b110001, 0b110101, 0b101001, 0b011001, 0b111000,
+              0b111001, 0b100101, 0b010101, 0b110100, 0b001101, 0b101100, 0b011100, 0b010111,
+              0b011011, 0b100011, 0b010011, 0b110010, 0b001011, 0b101010, 0b011010, 0b111010,
+              0b110011, 0b100110, 0b010110, 0b110110, 0b001110, 0b101110, 0b011110, 0b101011] # EDCBA -> abcdei, RD-
+CODES_3B4B = [0b1011, 0b1001, 0b0101, 0b1100, 0b1101, 0b1010, 0b0110, 0b1110] # HGF -> fghj, RD- (7 is P7)
+CODE_3B4B_A7 = 0b0111 # alternate 7, avoids a run of five equal bits after some 6 bit codes
+
+
+def _make_8b10b_tables():
+    """ (codes, flips): codes[rd, byte] is the 10 bit code of the byte for running disparity rd (0: -1, 1: +1),
+    flips[byte] is 1 when the code changes the running disparity (same for both rd) """
+    codes = np.zeros((2, 256), dtype=np.int64)
+    flips = np.zeros(256, dtype=np.uint8)
+
+    for byte in range(256):
+        x, y = byte & 0x1F, byte >> 5
+        unbalanced_6b = bin(CODES_5B6B[x]).count('1') != 3
+        unbalanced_4b = bin(CODES_3B4B[y]).count('1') != 2
+        flips[byte] = unbalanced_6b ^ unbalanced_4b
+
+        for rd in (0, 1):
+            code_6b = CODES_5B6B[x]
+            if rd and (unbalanced_6b or x == 7): # RD+ uses the complement (D.07 has two balanced versions)
+                code_6b ^= 0x3F
+
+            rd_4b = rd ^ unbalanced_6b # running disparity after the 6 bit sub-block
+            if y == 7 and ((rd_4b == 0 and x in (17, 18, 20)) or (rd_4b == 1 and x in (11, 13, 14))):
+                code_4b = CODE_3B4B_A7
+            else:
+                code_4b = CODES_3B4B[y]
+            if rd_4b and (unbalanced_4b or y == 3):
+                code_4b ^= 0xF
+
+            codes[rd, byte] = code_6b << 4 | code_4b
+
+    return codes, flips
+
+
+_CODES_8B10B, FLIPS_8B10B = _make_8b10b_tables()
+TABLE_8B10B = _bits_table(_CODES_8B10B.ravel(), 10).reshape(2, 256, 10) # [rd, byte] -> 10 bits (abcdei fghj)
+DECODE_8B10B = np.zeros(1024, dtype=np.uint8) # 10 bit code -> byte (either running disparity), invalid codes decode to 0
+DECODE_8B10B[_CODES_8B10B[0]] = np.arange(256)
+DECODE_8B10B[_CODES_8B10B[1]] = np.arange(256)
+
+
+def _bytes_of(bits):
+    return np.packbits(as_bits(bits)[:len(bits) // 8 * 8])
+
+
+def _decode_groups(bits, table):
+    """ Bytes of every complete 10 bit group, looked up in table """
+    groups = as_bits(bits)[:len(bits) // 10 * 10].reshape(-1, 10)
+    return table[groups @ (1 << np.arange(9, -1, -1))]
+
+
+def encode_4b5b(bits):
+    return _pad_to_bytes(TABLE_4B5B[_bytes_of(bits)].ravel())
+
+
+def decode_4b5b(bits):
+    return np.unpackbits(_decode_groups(bits, DECODE_4B5B))
+
+
+def encode_8b10b(bits):
+    """ 8B/10B with running disparity, starting at -1. The disparity before each byte is the xor of the flips of the
+    bytes before it, so every code comes from one table lookup """
+    data = _bytes_of(bits) # x = EDCBA is the low 5 bits, y = HGF the high 3
+    flips = FLIPS_8B10B[data]
+    running_disparity = np.bitwise_xor.accumulate(flips) ^ flips # exclusive prefix xor
+    return _pad_to_bytes(TABLE_8B10B[running_disparity, data].ravel())
+
+
+def decode_8b10b(bits):
+    return np.unpackbits(_decode_groups(bits, DECODE_8B10B))
+
+
+# Scrambled NRZI ---------------------------------------------------------------------------------------------------------------------
+
+SCRAMBLER_TAPS = (39, 58) # self-synchronizing scrambler 1 + x^39 + x^58 (10GBASE-R)
+
+
+def scramble(bits, taps=SCRAMBLER_TAPS):
+    """ s[n] = d[n] ^ s[n - 39] ^ s[n - 58], state starts at 0
+
+    The feedback is 1 / (1 + p) with p = x^39 + x^58. Over GF(2), 1 / (1 + p) = (1 + p)(1 + p^2)(1 + p^4)... and
+    p^(2^j) = x^(39 * 2^j) + x^(58 * 2^j), so the recursion becomes log2(n / 39) shifted xors of the whole array.
+    """
+    scrambled = as_bits(bits).copy()
+    shifts = list(taps)
+    while min(shifts) < len(scrambled):
+        feedback = np.zeros_like(scrambled)
+        for shift in shifts:
+            feedback[shift:] ^= scrambled[:max(len(scrambled) - shift, 0)]
+        scrambled ^= feedback
+        shifts = [2 * shift for shift in shifts]
+    return scrambled
+
+
+def descramble(bits, taps=SCRAMBLER_TAPS):
+    """ d[n] = s[n] ^ s[n - 39] ^ s[n - 58], one bit error turns into 3 """
+    scrambled = as_bits(bits)
+    data = scrambled.copy()
+    for shift in taps:
+        data[shift:] ^= scrambled[:max(len(scrambled) - shift, 0)]
+    return data
+
+
+def encode_scrambled_nrzi(bits):
+    """ NRZI: a 1 toggles the line level, a 0 keeps it """
+    return np.bitwise_xor.accumulate(scramble(bits))
+
+
+def decode_scrambled_nrzi(levels):
+    levels = as_bits(levels)
+    return descramble(levels ^ np.concatenate(([0], levels[:-1])).astype(np.uint8))
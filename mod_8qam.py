@@ -3,49 +3,48 @@ import numpy as np
 
 
 class Mod_8qam:
-    def __init__(self):
+    # Constelacao para o 8QAM, o indice e o valor dos 3 bits do simbolo (b0*4 + b1*2 + b2)
+    constelacao = np.array([
+        complex(-1, -1),  # (0, 0, 0)
+        complex(-1, 1),   # (0, 0, 1)
+        complex(1, -1),   # (0, 1, 0)
+        complex(1, 1),    # (0, 1, 1)
+        complex(-1, -3),  # (1, 0, 0)
+        complex(-1, 3),   # (1, 0, 1)
+        complex(1, -3),   # (1, 1, 0)
+        complex(1, 3)     # (1, 1, 1)
+    ])
+    pesos_bits = np.array([4, 2, 1])
+
+    def __init__(self, amostras_por_simbolo=100):
         self.taxa_modulacao = 8
         self.taxa_transmissao = 24
+        self.amostras_por_simbolo = amostras_por_simbolo
 
     def modulacao_8qam(self, bits):
-        while len(bits) % 3 != 0:
-            bits = np.append(bits, 0)
+        bits = np.asarray(bits, dtype=np.uint8).ravel()
+        bits = np.concatenate((bits, np.zeros(-len(bits) % 3, dtype=np.uint8)))  # completa com 0's ate um multiplo de 3
 
-        bits_simbolos = [tuple(bits[i:i + 3]) for i in range(0, len(bits), 3)]
+        indices_simbolos = bits.reshape(-1, 3) @ self.pesos_bits  # cada linha (3 bits) vira o indice na constelacao
 
-        # Constelacao para o 8QAM
-        mapa = {
-            (0, 0, 0): complex(-1, -1),
-            (0, 0, 1): complex(-1, 1),
-            (0, 1, 0): complex(1, -1),
-            (0, 1, 1): complex(1, 1),
-            (1, 0, 0): complex(-1, -3),
-            (1, 0, 1): complex(-1, 3),
-            (1, 1, 0): complex(1, -3),
-            (1, 1, 1): complex(1, 3)
-        }
-
-        simbolos_modulados = [mapa[bits] for bits in bits_simbolos]
+        simbolos_modulados = self.constelacao[indices_simbolos]
 
         return simbolos_modulados
 
     def banda_base_8qam(self, simbolos_modulados):
         duracao_simbolo = 1 / self.taxa_modulacao
+        amostras = self.amostras_por_simbolo
 
-        num_simbolos = len(simbolos_modulados)
-        tempo_simbolo = np.linspace(0, duracao_simbolo, 100)
-
-        tempo_total = np.linspace(
-            0, duracao_simbolo * num_simbolos, num_simbolos * 100)
-        forma_onda = np.zeros(len(tempo_total), dtype=complex)
+        simbolos_modulados = np.asarray(simbolos_modulados, dtype=complex)
+        tempo_simbolo = np.linspace(0, duracao_simbolo, amostras)
+        portadora = np.exp(1j * 2 * np.pi * self.taxa_modulacao * tempo_simbolo)
 
-        for i, simbolo in enumerate(simbolos_modulados):
-            forma_onda[i * 100: (i + 1) * 100] = simbolo * np.exp(1j *
-                                                                  2 * np.pi * self.taxa_modulacao * tempo_simbolo)
+        # cada simbolo multiplica um periodo da portadora (broadcast (n, 1) x (1, amostras))
+        forma_onda = (simbolos_modulados[:, np.newaxis] * portadora[np.newaxis, :]).ravel()
 
         num_bauds = len(simbolos_modulados)
         baud_duracao = 1 / self.taxa_transmissao
-        tempo_total = np.linspace(0, baud_duracao * num_bauds, num_bauds * 100)
+        tempo_total = np.linspace(0, baud_duracao * num_bauds, num_bauds * amostras)
 
         # cores = np.random.rand(num_bauds, 3)
 
@@ -66,6 +65,26 @@ class Mod_8qam:
 
         return num_bauds, tempo_total, forma_onda
 
+    def demodulacao_8qam(self, forma_onda, num_bits=None):
+        """ Recupera os bits da forma de onda: correlaciona cada simbolo com a portadora e escolhe o ponto mais proximo da constelacao """
+        amostras = self.amostras_por_simbolo
+        forma_onda = np.asarray(forma_onda, dtype=complex)
+
+        tempo_simbolo = np.linspace(0, 1 / self.taxa_modulacao, amostras)
+        portadora = np.exp(1j * 2 * np.pi * self.taxa_modulacao * tempo_simbolo)
+
+        blocos = forma_onda[:len(forma_onda) // amostras * amostras].reshape(-1, amostras)
+        simbolos_estimados = blocos @ np.conj(portadora) / amostras  # |portadora| = 1 em todas as amostras
+
+        distancias = np.abs(simbolos_estimados[:, np.newaxis] - self.constelacao[np.newaxis, :])
+        indices_simbolos = np.argmin(distancias, axis=1)
+
+        bits = ((indices_simbolos[:, np.newaxis] >> np.array([2, 1, 0])) & 1).astype(np.uint8).ravel()  # indice -> 3 bits
+
+        if num_bits is not None:
+            bits = bits[:num_bits]  # remove os 0's usados para completar o ultimo simbolo
+        return bits
+
     def run(self, bits):
         simbolos_modulados = self.modulacao_8qam(bits)
         num_bauds, tempo, sinal_banda_base = self.banda_base_8qam(
@@ -0,0 +1,94 @@
+import numpy as np
+from bits import as_bits, frames_matrix
+
+
+PARITY_2D_ROW_BITS = 8 # data bits per row of the 2-D parity, one row per byte
+
+
+def even_parity_frames(frames) -> np.ndarray:
+    """ Even parity bit of every frame (list of bit arrays) in one reduction, as a uint8 array """
+    return np.bitwise_xor.reduce(frames_matrix(frames), axis=1) # the zeros padding the short frames don't change it
+
+
+def _column_parities(rows_matrix, rows_per_frame):
+    """ Xor of the rows of each frame, for frames stored one after the other in rows_matrix """
+    cumulative = np.zeros((len(rows_matrix) + 1, rows_matrix.shape[1]), dtype=np.uint8)
+    np.bitwise_xor.accumulate(rows_matrix, axis=0, out=cumulative[1:])
+    bounds = np.cumsum([0] + list(rows_per_frame))
+    return cumulative[bounds[1:]] ^ cumulative[bounds[:-1]] # prefix xor, works for frames without rows too
+
+
+def parity_2d_encode_frames(frames):
+    """ Each frame becomes data + one parity bit per row of PARITY_2D_ROW_BITS data bits + one parity bit per column
+
+    A single error flips one row and one column parity, which locates the bit. The last row is not completed,
+    the missing bits count as zeros.
+    """
+    frames = [as_bits(frame) for frame in frames]
+    if not frames:
+        return []
+
+    width = PARITY_2D_ROW_BITS
+    rows_per_frame = [-(-len(frame) // width) for frame in frames]
+    rows_matrix = np.concatenate([np.concatenate((frame, np.zeros(-len(frame) % width, dtype=np.uint8))) for frame in frames]).reshape(-1, width)
+
+    row_parities = np.bitwise_xor.reduce(rows_matrix, axis=1) # every row of every frame at once
+    column_parities = _column_parities(rows_matrix, rows_per_frame)
+
+    new_frames = []
+    first_row = 0
+    for frame, num_rows, columns in zip(frames, rows_per_frame, column_parities):
+        new_frames.append(np.concatenate((frame, row_parities[first_row:first_row + num_rows], columns)))
+        first_row += num_rows
+    return new_frames
+
+
+def parity_2d_decode_frames(frames):
+    """ (data bits of each frame, error found in each frame); a single error per frame is corrected
+
+    A frame whose length was broken by the channel (bits lost or added by the deframing) is flagged and its leading
+    bits are passed through uncorrected, since its parity bits can't be located; the other frames are still corrected.
+    """
+    width = PARITY_2D_ROW_BITS
+    data_frames = []
+    received_rows = []
+    received_columns = []
+    rows_per_frame = []
+    malformed = []
+
+    for frame in frames:
+        frame = as_bits(frame)
+        num_rows = -(-(len(frame) - width) // (width + 1)) # len = data + ceil(data / width) + width
+        data_len = len(frame) - width - num_rows
+        bad = data_len < 0 or -(-data_len // width) != num_rows
+        if bad: # no parity bits to trust: no rows, nothing to correct
+            num_rows = 0
+        malformed.append(bad)
+
+        data_frames.append(frame[:max(data_len, 0)].copy())
+        received_rows.append(frame[data_len:data_len + num_rows])
+        received_columns.append(np.zeros(width, dtype=np.uint8) if bad else frame[data_len + num_rows:])
+        rows_per_frame.append(num_rows)
+
+    if not frames:
+        return [], []
+
+    rows_matrix = np.concatenate([np.concatenate((data, np.zeros(-len(data) % width, dtype=np.uint8))) if not bad else np.zeros(0, dtype=np.uint8)
+                                  for data, bad in zip(data_frames, malformed)]).reshape(-1, width)
+    bad_rows = np.bitwise_xor.reduce(rows_matrix, axis=1) ^ np.concatenate(received_rows)
+    bad_columns = _column_parities(rows_matrix, rows_per_frame) ^ np.array(received_columns)
+
+    list_detection_error = []
+    first_row = 0
+    for data, num_rows, frame_bad_columns, bad in zip(data_frames, rows_per_frame, bad_columns, malformed):
+        frame_bad_rows = np.flatnonzero(bad_rows[first_row:first_row + num_rows])
+        frame_bad_columns = np.flatnonzero(frame_bad_columns)
+        first_row += num_rows
+
+        if len(frame_bad_rows) == 1 and len(frame_bad_columns) == 1: # single data error, flip it back
+            position = frame_bad_rows[0] * width + frame_bad_columns[0]
+            if position < len(data):
+                data[position] ^= 1
+        list_detection_error.append(bool(len(frame_bad_rows) or len(frame_bad_columns)) or bad)
+
+    return data_frames, list_detection_error
@@ -0,0 +1,127 @@
+import contextlib
+import logging
+import time
+import tracemalloc
+
+
+logger = logging.getLogger(__name__)
+
+
+def count_bits(data):
+    """ Bits in a bit array or in a list of frames, None when there is nothing to count """
+    if data is None:
+        return None
+    if isinstance(data, list):
+        return sum(len(frame) for frame in data)
+    return len(data)
+
+
+class StageStats:
+    """ Timers, sizes and allocations of one stage of a run """
+    def __init__(self, name, bits_in=None):
+        self.name = name
+        self.bits_in = bits_in
+        self.bits_out = None
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.allocated_bytes = None # memory still allocated at the end of the stage (only with trace_memory)
+        self.peak_bytes = None # highest memory use during the stage, over the memory at its start
+        self.allocations = None # memory blocks allocated and not freed during the stage
+
+    def output(self, data):
+        """ Records the size of the stage output (bit array or list of frames) """
+        self.bits_out = count_bits(data)
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+class RunStats:
+    """ Stage by stage stats of one Transmissor.run or Receiver.run
+
+    hook(run_stats) is called when the run finishes, to export the stats. trace_memory turns on tracemalloc for
+    the allocation counts; it slows the run down, so it is off by default. Used as a context manager, tracemalloc
+    is stopped even when the run raises (the hook is only called for runs that finish).
+    """
+    def __init__(self, name, hook=None, trace_memory=False):
+        self.name = name
+        self.hook = hook
+        self.trace_memory = trace_memory
+        self.stages = []
+        self.started_tracing = False
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+
+    @contextlib.contextmanager
+    def stage(self, name, data_in=None):
+        """ Times the code inside the with block as one stage, data_in is its input """
+        stage = StageStats(name, count_bits(data_in))
+        if self.trace_memory:
+            snapshot = self._snapshot()
+            memory_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+
+        try:
+            yield stage
+        finally:
+            stage.wall_seconds = time.perf_counter() - wall_start
+            stage.cpu_seconds = time.process_time() - cpu_start
+            if self.trace_memory:
+                memory_end, memory_peak = tracemalloc.get_traced_memory()
+                stage.allocated_bytes = memory_end - memory_start
+                stage.peak_bytes = memory_peak - memory_start
+                stage.allocations = sum(stat.count_diff for stat in self._snapshot().compare_to(snapshot, 'lineno') if stat.count_diff > 0)
+            self.stages.append(stage)
+            logger.debug("%s %s: %.6f s wall, %.6f s cpu, %s -> %s bits", self.name, name, stage.wall_seconds, stage.cpu_seconds, stage.bits_in, stage.bits_out)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.finish()
+        else:
+            self.stop_tracing()
+        return False
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+
+    def finish(self):
+        """ Ends the run: stops tracemalloc if this run started it and hands the stats to the hook """
+        self.stop_tracing()
+        if self.hook is not None:
+            self.hook(self)
+        return self
+
+    def stop_tracing(self):
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    @property
+    def wall_seconds(self):
+        return sum(stage.wall_seconds for stage in self.stages)
+
+    @property
+    def cpu_seconds(self):
+        return sum(stage.cpu_seconds for stage in self.stages)
+
+    def as_dict(self):
+        return {"name": self.name, "wall_seconds": self.wall_seconds, "cpu_seconds": self.cpu_seconds,
+                "stages": [stage.as_dict() for stage in self.stages]}
+
+    def report(self):
+        """ One line per stage and a total, as a text table """
+        lines = [f"{self.name:<14} {'wall ms':>10} {'cpu ms':>10} {'bits in':>10} {'bits out':>10} {'alloc KB':>10} {'blocks':>8}"]
+        for stage in self.stages:
+            allocated = "-" if stage.allocated_bytes is None else f"{stage.allocated_bytes / 1024:.1f}"
+            allocations = "-" if stage.allocations is None else stage.allocations
+            bits_in = "-" if stage.bits_in is None else stage.bits_in
+            bits_out = "-" if stage.bits_out is None else stage.bits_out
+            lines.append(f"{stage.name:<14} {stage.wall_seconds*1e3:10.3f} {stage.cpu_seconds*1e3:10.3f} {bits_in:>10} {bits_out:>10} {allocated:>10} {allocations:>8}")
+        lines.append(f"{'total':<14} {self.wall_seconds*1e3:10.3f} {self.cpu_seconds*1e3:10.3f}")
+        return "\n".join(lines)
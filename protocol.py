@@ -0,0 +1,171 @@
+import struct
+import numpy as np
+from bits import as_bits
+
+
+# Wire format (network byte order):
+#   magic (4s) | version (B) | message type (B) | encoding (B) | framing (B) | error correction/detection (B) | modulation (B)
+#   | hamming code (B) | count header bytes (B) | sequence number (I) | bit count (Q) | payload length in bytes (Q)
+# followed by the payload: the bits packed 8 per byte (np.packbits), the last byte completed with 0's.
+HEADER = struct.Struct('!4sBBBBBBBBIQQ')
+MAGIC = b'TR1\x00'
+VERSION = 3 # 2: count header bytes, 3: hamming code
+
+MSG_DATA = 1
+MSG_ACK = 2 # header only, bit count = number of bits received
+
+# Scheme ids sent in the header, 0 means not informed
+ENCODING_IDS = {"nrz": 1, "manchester": 2, "bipolar": 3, "4b5b": 4, "8b10b": 5, "scrambled_nrzi": 6}
+FRAMING_IDS = {"character_count": 1, "byte_insertion": 2, "bits_insertion": 3}
+ERROR_CORRECTION_OR_DETECTION_IDS = {"even_parity": 1, "crc": 2, "hamming": 3, "parity_2d": 4}
+MODULATION_IDS = {"ask": 1, "fsk": 2, "8qam": 3}
+HAMMING_CODE_IDS = {"7,4": 1, "15,11": 2, "72,64": 3} # keys of hamming.HAMMING_CODES, 0 means the default (15,11)
+
+
+class ProtocolError(Exception):
+    """ Raised when the received bytes are not a valid message """
+
+
+class Message:
+    """ A message read from the socket: the bits plus the schemes informed by the transmissor """
+    def __init__(self, msg_type, bits, sequence=0, encoding_method=None, framing_method=None, error_correction_or_detection_method=None, modulation_method=None, count_header_bytes=1, hamming_code="15,11"):
+        self.msg_type = msg_type
+        self.bits = bits
+        self.sequence = sequence
+        self.encoding_method = encoding_method
+        self.framing_method = framing_method
+        self.error_correction_or_detection_method = error_correction_or_detection_method
+        self.modulation_method = modulation_method
+        self.count_header_bytes = count_header_bytes # width of the character count header, changes the frames on the wire
+        self.hamming_code = hamming_code # block code used when the error correction is hamming
+        self.connection = None # set by the receiver: (connection id, peer address)
+        self.decoded = None # set by the receiver when the schemes are known: (bits, bits_cleaned, text)
+        self.decode_error = None # set by the receiver when decoding failed, decoded stays None
+
+
+def _scheme_id(ids, name):
+    return ids[name.lower()] if name else 0
+
+
+def _scheme_name(ids, scheme_id):
+    for name, value in ids.items():
+        if value == scheme_id:
+            return name
+    return None
+
+
+def encode_header(msg_type, num_bits, payload_len, sequence=0, encoding_method=None, framing_method=None, error_correction_or_detection_method=None, modulation_method=None, count_header_bytes=1, hamming_code=None):
+    return HEADER.pack(MAGIC, VERSION, msg_type,
+                       _scheme_id(ENCODING_IDS, encoding_method),
+                       _scheme_id(FRAMING_IDS, framing_method),
+                       _scheme_id(ERROR_CORRECTION_OR_DETECTION_IDS, error_correction_or_detection_method),
+                       _scheme_id(MODULATION_IDS, modulation_method),
+                       _scheme_id(HAMMING_CODE_IDS, hamming_code),
+                       count_header_bytes, sequence, num_bits, payload_len)
+
+
+def encode_message(bits, sequence=0, encoding_method=None, framing_method=None, error_correction_or_detection_method=None, modulation_method=None, count_header_bytes=1, hamming_code=None):
+    """ Returns (header, payload) of a data message, payload is the packed bits """
+    bits = as_bits(bits)
+    payload = np.packbits(bits)
+    header = encode_header(MSG_DATA, len(bits), len(payload), sequence, encoding_method, framing_method, error_correction_or_detection_method, modulation_method, count_header_bytes, hamming_code)
+    return header, payload
+
+
+def decode_header(header):
+    """ Returns (msg_type, sequence, num_bits, payload_len, schemes) and checks magic, version and lengths
+
+    schemes is (encoding, framing, error correction/detection, modulation, count header bytes, hamming code), the
+    arguments Message takes after the sequence number.
+    """
+    magic, version, msg_type, encoding_id, framing_id, edc_id, modulation_id, hamming_id, count_header_bytes, sequence, num_bits, payload_len = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ProtocolError(f"invalid magic {magic!r}")
+    if version != VERSION:
+        raise ProtocolError(f"unsupported version {version}")
+    if msg_type not in (MSG_DATA, MSG_ACK) or (msg_type == MSG_ACK and payload_len != 0):
+        raise ProtocolError(f"invalid message type {msg_type}")
+    if msg_type == MSG_DATA and payload_len != (num_bits + 7) // 8:
+        raise ProtocolError(f"payload of {payload_len} bytes can't hold {num_bits} bits")
+    if msg_type == MSG_DATA and count_header_bytes == 0:
+        raise ProtocolError("count header of 0 bytes")
+    if hamming_id and _scheme_name(HAMMING_CODE_IDS, hamming_id) is None: # an unknown code would decode to garbage
+        raise ProtocolError(f"unknown hamming code {hamming_id}")
+
+    schemes = (_scheme_name(ENCODING_IDS, encoding_id),
+               _scheme_name(FRAMING_IDS, framing_id),
+               _scheme_name(ERROR_CORRECTION_OR_DETECTION_IDS, edc_id),
+               _scheme_name(MODULATION_IDS, modulation_id),
+               count_header_bytes,
+               _scheme_name(HAMMING_CODE_IDS, hamming_id) or "15,11")
+    return msg_type, sequence, num_bits, payload_len, schemes
+
+
+def send_message(sock, bits, sequence=0, encoding_method=None, framing_method=None, error_correction_or_detection_method=None, modulation_method=None, count_header_bytes=1, hamming_code=None):
+    header, payload = encode_message(bits, sequence, encoding_method, framing_method, error_correction_or_detection_method, modulation_method, count_header_bytes, hamming_code)
+    sock.sendall(header)
+    sock.sendall(memoryview(payload)) # no copy of the packed bits
+
+
+def send_ack(sock, num_bits, sequence=0):
+    sock.sendall(encode_header(MSG_ACK, num_bits, 0, sequence))
+
+
+def recv_exactly(sock, buffer):
+    """ Fills the whole buffer (bytearray/memoryview) from the socket, recv_into until every byte arrives """
+    view = memoryview(buffer)
+    received = 0
+    while received < len(view):
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            raise ConnectionError(f"connection closed after {received} of {len(view)} bytes")
+        received += n
+    return buffer
+
+
+def recv_message(sock):
+    """ Reads one message (header + payload) from the socket """
+    header = recv_exactly(sock, bytearray(HEADER.size))
+    msg_type, sequence, num_bits, payload_len, schemes = decode_header(header)
+
+    payload = recv_exactly(sock, bytearray(payload_len)) # preallocated, no size limit
+
+    return _build_message(msg_type, sequence, num_bits, payload, schemes)
+
+
+def _build_message(msg_type, sequence, num_bits, payload, schemes):
+    bits = np.unpackbits(np.frombuffer(payload, dtype=np.uint8), count=num_bits) if msg_type == MSG_DATA else num_bits
+    return Message(msg_type, bits, sequence, *schemes)
+
+
+class StreamDecoder:
+    """ Incremental decoder for a persistent connection: feed it bytes as they arrive and it returns the messages
+    completed so far, a message split across several recv calls is kept until the rest arrives """
+    def __init__(self):
+        self.buffer = bytearray()
+        self.start = 0 # first byte not consumed yet
+
+    def feed(self, data):
+        self.buffer += data
+        messages = []
+
+        while len(self.buffer) - self.start >= HEADER.size:
+            header = self.buffer[self.start:self.start + HEADER.size]
+            msg_type, sequence, num_bits, payload_len, schemes = decode_header(header)
+
+            end = self.start + HEADER.size + payload_len
+            if len(self.buffer) < end: # payload not complete yet
+                break
+
+            payload = bytes(self.buffer[self.start + HEADER.size:end])
+            messages.append(_build_message(msg_type, sequence, num_bits, payload, schemes))
+            self.start = end
+
+        if self.start > len(self.buffer) // 2: # drop the consumed bytes once they are half of the buffer
+            del self.buffer[:self.start]
+            self.start = 0
+
+        return messages
+
+    def pending_bytes(self):
+        return len(self.buffer) - self.start
@@ -1,25 +1,44 @@
 import socket
-import pickle
+import logging
+import time
+import asyncio
+import itertools
+import queue
+import numpy as np
 from transmissor import Transmissor
-from threading import Thread
+from mod_8qam import Mod_8qam
+from threading import Thread, Event
+from crc import crc32_frames
+from hamming import HAMMING_CODES
+from parity import even_parity_frames, parity_2d_decode_frames
+from line_codes import decode_4b5b, decode_8b10b, decode_scrambled_nrzi
+from profiling import RunStats
+import protocol
+from bits import as_bits, concat_bits, bits_to_bytes, write_bits, bits_to_int, window_values, runs_of_ones
+
+
+logger = logging.getLogger(__name__)
 
 
 class Receiver:
-    def __init__(self, host='127.0.0.1', port=65432):
+    manchester_zero = np.array([0, 1], dtype=np.uint8).view(np.uint16)[0] # the half bit levels of a 0 as one 2 byte item
+    manchester_invalid = np.array([[0, 0], [1, 1]], dtype=np.uint8).view(np.uint16).ravel() # pairs without a transition
+    def __init__(self, host='127.0.0.1', port=65432, queue_size=1024):
         self.host = host
         self.port = port
         self.running = True
-        self.bits_array = []
+        self.bits_array = np.zeros(0, dtype=np.uint8)
+        self.demodulation_stats = {}
+        self.messages_received = 0
+        self.inbox = queue.Queue(maxsize=queue_size) # complete messages, in arrival order, from every connection
+        self.connection_ids = itertools.count(1)
         self.server_thread: Thread
+        self.loop = None # event loop of the async server
+        self.line_code_violations = 0 # invalid Manchester pairs or AMI violations found by the last run
 
     def __binary_2_text(self, bits):
         """ Converts binary to text """
-        bits_str = ''.join(map(str, bits))  # convert list of bits to a string of bits
-        bytes_list = [bits_str[i:i+8] for i in range(0, len(bits_str), 8)]  # divide the string of bits into bytes
-        bytes_list = [int(byte, 2) for byte in bytes_list]  # convert bytes to integers
-        bytes_array = bytearray(bytes_list)  # convert list of integers to bytearray
-        text = bytes_array.decode('utf8')  # decode bytearray to string
-        return text
+        return bits_to_bytes(bits).decode('utf8', errors='replace')  # pack the bits into bytes and decode them, bytes corrupted by the channel are replaced
 
     def start_server(self):
         self.server_thread = Thread(target=self._start_server)
@@ -29,140 +48,417 @@ class Receiver:
     def _start_server(self):
         socket_servidor = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         socket_servidor.bind((self.host, self.port))
-        socket_servidor.listen(1)
+        socket_servidor.listen()
         print("Listening on port 65432")
         while True and self.running:
             conexao_socket, end = socket_servidor.accept()
             print(end, 'Connected!')
 
-            dados = conexao_socket.recv(4096)  # receber ate 1024 bytes
-            dados_list = pickle.loads(dados)
-            self.bits_array = dados_list
+            try:
+                self.handle_connection(conexao_socket, (next(self.connection_ids), end)) # keeps reading until the transmissor closes the connection
+            except (protocol.ProtocolError, ConnectionError) as error: # a bad client only loses its own connection
+                print(end, 'Connection dropped:', error)
+            finally:
+                conexao_socket.close()
+
+
+    def handle_connection(self, conexao_socket, connection):
+        """ Decodes the messages of a (possibly persistent) connection as the bytes arrive, queues and acks each one """
+        decoder = protocol.StreamDecoder()
+        buffer = bytearray(1 << 16)
+        view = memoryview(buffer)
+
+        while True:
+            n = conexao_socket.recv_into(view)
+            if n == 0: # connection closed by the transmissor
+                break
+            for mensagem in decoder.feed(view[:n]):
+                mensagem.connection = connection
+                self.inbox.put(mensagem) # blocks while the queue is full, the transmissor waits for the ack
+                self.messages_received += 1
+                protocol.send_ack(conexao_socket, len(mensagem.bits), mensagem.sequence)
+
+
+
+    # asyncio server: many concurrent transmissors, decoding runs on an executor so the event loop never blocks
+    def start_async_server(self, executor=None, max_pending=64):
+        """ Runs serve_async on its own thread and returns once the server is listening, raises the error if it
+        couldn't start (port in use, for example) """
+        self.async_ready = Event()
+        self.async_error = None
+        self.server_thread = Thread(target=self._run_async_server, args=(executor, max_pending))
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        self.async_ready.wait()
+        if self.async_error is not None:
+            raise self.async_error
+
+
+    def _run_async_server(self, executor, max_pending):
+        try:
+            asyncio.run(self.serve_async(executor, max_pending))
+        except Exception as error:
+            if error is not self.async_error: # a start-up error goes to start_async_server instead
+                raise
+
+
+    def stop_async_server(self, timeout=5):
+        """ Stops accepting connections, lets the open ones finish for up to timeout seconds and stops the loop """
+        if self.loop is None or not self.server_thread.is_alive(): # never started, or already stopped
+            return
+        self.shutdown_timeout = timeout
+        self.loop.call_soon_threadsafe(self.stop_event.set)
+        self.server_thread.join()
+
+
+    async def serve_async(self, executor=None, max_pending=64):
+        self.loop = asyncio.get_running_loop()
+        self.stop_event = asyncio.Event()
+        self.shutdown_timeout = 5
+        self.executor = executor # None -> default thread pool of the loop
+        self.decode_slots = asyncio.Semaphore(max_pending) # backpressure: at most max_pending messages being decoded
+        self.client_tasks = set()
+
+        try:
+            server = await asyncio.start_server(self.handle_client, self.host, self.port)
+            print(f"Listening on port {self.port} (asyncio)")
+        except Exception as error:
+            self.async_error = error
+            raise
+        finally: # start_async_server waits for this, whether the server started or not
+            if hasattr(self, 'async_ready'):
+                self.async_ready.set()
+
+        await self.stop_event.wait()
+
+        server.close() # no new connections
+        if self.client_tasks:
+            done, pending = await asyncio.wait(self.client_tasks, timeout=self.shutdown_timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        await server.wait_closed()
+
+
+    async def handle_client(self, reader, writer):
+        task = asyncio.current_task()
+        self.client_tasks.add(task)
+        decoder = protocol.StreamDecoder()
+        connection = (next(self.connection_ids), writer.get_extra_info('peername'))
+
+        try:
+            while data := await reader.read(1 << 16):
+                for mensagem in decoder.feed(data):
+                    mensagem.connection = connection
+                    await self.process_message(mensagem)
+                    writer.write(protocol.encode_header(protocol.MSG_ACK, len(mensagem.bits), 0, mensagem.sequence))
+                await writer.drain() # waits if the transmissor isn't reading the acks
+        except (protocol.ProtocolError, ConnectionError) as error:
+            print(writer.get_extra_info('peername'), 'Connection dropped:', error)
+        except asyncio.CancelledError: # shutdown timed out on this connection, it is closed below without a traceback
+            pass
+        finally:
+            self.client_tasks.discard(task)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+    async def process_message(self, mensagem):
+        schemes = (mensagem.encoding_method, mensagem.framing_method, mensagem.error_correction_or_detection_method)
+        if None not in schemes: # without the schemes only the bits are queued
+            async with self.decode_slots: # deframing and EDC run off the event loop
+                try:
+                    mensagem.decoded = await self.loop.run_in_executor(self.executor, decode_message, mensagem.bits, *schemes, mensagem.count_header_bytes, mensagem.hamming_code)
+                except Exception as error: # a message that can't be decoded is still queued (and acked) with the error
+                    logger.warning("message %s of connection %s not decoded: %r", mensagem.sequence, mensagem.connection, error)
+                    mensagem.decode_error = error
+
+        try:
+            self.inbox.put_nowait(mensagem)
+        except queue.Full: # waits for room on a worker thread, so the loop keeps serving the other connections
+            await asyncio.to_thread(self.inbox.put, mensagem)
+        self.messages_received += 1
+
 
-            conexao_socket.send(pickle.dumps(self.bits_array))
+    def receive(self, timeout=None):
+        """ Returns the next complete message (protocol.Message with bits, connection and sequence), blocking until
+        one arrives, raises queue.Empty after timeout seconds """
+        return self.inbox.get(timeout=timeout)
 
-            conexao_socket.close()
+
+    async def receive_async(self, timeout=None):
+        return await asyncio.to_thread(self.receive, timeout)
 
 
 # Run methods start ---------------------------------------------------------------------------------------------------------------------
 
-    def run(self, encoding_method, framing_method, error_correction_or_detection_method):
+    def run(self, encoding_method, framing_method, error_correction_or_detection_method, modulation_method=None, signal=None, num_bits=None, bits=None, count_header_bytes=1, hamming_code="15,11", hook=None, trace_memory=False, modulation_params=None):
+        """ Stage timings go to self.run_stats (see profiling.RunStats), hook(run_stats) is called at the end
+
+        modulation_params must be the ones given to Transmissor.run (see Transmissor.modulation_settings).
+        """
+        with RunStats("receiver", hook, trace_memory) as stats: # stops tracemalloc even if a stage raises
+            self.run_stats = stats
+            if bits is not None: # bits of a message taken from receive()
+                self.bits_array = bits
+            if signal is not None: # physical layer: recover the bits from the received waveform
+                with stats.stage("demodulation") as stage:
+                    self.bits_array = self.demodulate(signal, modulation_method, num_bits, modulation_params)
+                    stage.output(self.bits_array)
+            self.bits_array = as_bits(self.bits_array)
+
+            with stats.stage("deframing", self.bits_array) as stage:
+                match framing_method.lower():
+                    case "character_count":
+                        self.frames, self.padding_bits_list = self.character_count_deframing(self.bits_array, count_header_bytes) # frame sizes come from the headers
+                    case "byte_insertion":
+                        self.frames, self.padding_bits_list  = self.bytes_insertion_deframing(self.bits_array)
+                    case "bits_insertion":
+                        if error_correction_or_detection_method == "crc":
+                            self.frames, self.padding_bits_list  = self.bits_insertion_deframing(self.bits_array, crc32=True)
+                        else:
+                            self.frames, self.padding_bits_list  = self.bits_insertion_deframing(self.bits_array, crc32=False)
+                stage.output(self.frames)
+
+            with stats.stage("edc", self.frames) as stage:
+                match error_correction_or_detection_method.lower():
+                    case "even_parity":
+                        self.frames_cleaned, self.list_error_detec = self.solve_even_parity(self.frames, self.padding_bits_list)
+                    case "crc":
+                        self.frames_cleaned, self.list_error_detec = self.solve_crc32(self.frames, self.padding_bits_list)
+                    case "hamming":
+                        self.frames_cleaned, self.list_error_detec = self.solve_hamming(self.frames, self.padding_bits_list, hamming_code)
+                    case "parity_2d":
+                        self.frames_cleaned, self.list_error_detec = self.solve_parity_2d(self.frames, self.padding_bits_list)
+                self.bits_cleaned = concat_bits(self.frames_cleaned) # data of each frame is kept for the simulations
+                stage.output(self.bits_cleaned)
+            logger.debug("frames with errors: %s", self.list_error_detec)
+
+
+            with stats.stage("decoder", self.bits_cleaned) as stage:
+                self.bits_cleaned, self.line_code_violations = self.line_decode(self.bits_cleaned, encoding_method)
+                stage.output(self.bits_cleaned)
+                
+        
+            with stats.stage("text", self.bits_cleaned):
+                final_str = self.__binary_2_text(self.bits_cleaned)
+
+        return self.bits_array, self.bits_cleaned, final_str
+
+
+    def write_message(self, sink, chunk_size=1 << 16):
+        """ Writes the bits decoded by the last run to a binary file-like object in chunks, returns the bytes written """
+        return write_bits(self.bits_cleaned, sink, chunk_size)
+
+# Run methods end ---------------------------------------------------------------------------------------------------------------------
 
-        match framing_method.lower():
-            case "character_count":
-                self.frames, self.padding_bits_list = self.character_count_deframing(self.bits_array)
-            case "byte_insertion":
-                self.frames, self.padding_bits_list  = self.bytes_insertion_deframing(self.bits_array)
-            case "bits_insertion":
-                if error_correction_or_detection_method == "crc":
-                    self.frames, self.padding_bits_list  = self.bits_insertion_deframing(self.bits_array, crc32=True)
-                else:
-                    self.frames, self.padding_bits_list  = self.bits_insertion_deframing(self.bits_array, crc32=False)
 
-        match error_correction_or_detection_method.lower():
-            case "even_parity":
-                self.bits_cleaned, self.list_error_detec = self.solve_even_parity(self.frames, self.padding_bits_list)
-            case "crc":
-                self.bits_cleaned, self.list_error_detec = self.solve_crc32(self.frames, self.padding_bits_list)
-            case "hamming":
-                self.bits_cleaned, self.list_error_detec = self.solve_hamming(self.frames, self.padding_bits_list)
 
+# Decoding methods start ---------------------------------------------------------------------------------------------------------------------
 
+    def line_decode(self, bits_array, encoding_method):
+        """ (decoded bits, line code violations) of a line coded bit array """
+        line_code_violations = 0
         match encoding_method.lower():
             case "nrz":	# -1 -> 0; 1 -> 1
-                pass
-            case "bipolar":	# 0 -> 0; (-1,1) -> 1
-                pass
+                bits_array = self.polar_nrz_decoder(bits_array)
+            case "bipolar":	# [0, 0] -> 0; [1, 0] or [0, 1] -> 1
+                levels, invalid_pairs = self.bipolar_levels(bits_array)
+                line_code_violations = invalid_pairs + self.ami_violations(levels)
+                bits_array = self.bipolar_decoder(levels)
             case "manchester":	# 0 -> 0; 1 -> 1
-                bit_pairs = [self.bits_cleaned[i:i+2] for i in range(0, len(self.bits_cleaned), 2)]
-                self.bits_cleaned = [0 if pair == [0, 1] else 1 for pair in bit_pairs]
-                
-        
-        final_str = self.__binary_2_text(self.bits_cleaned)
+                line_code_violations = self.manchester_violations(bits_array)
+                bits_array = self.manchester_decoder(bits_array)
+            case "4b5b":
+                bits_array = decode_4b5b(bits_array)
+            case "8b10b":
+                bits_array = decode_8b10b(bits_array)
+            case "scrambled_nrzi":
+                bits_array = decode_scrambled_nrzi(bits_array)
+        return bits_array, line_code_violations
 
-        bits_cleaned_str = ''.join(map(str, self.bits_cleaned))
 
-        return self.bits_array, bits_cleaned_str, final_str
+    def polar_nrz_decoder(self, signal):
+        return (np.asarray(signal) > 0).astype(np.uint8) # -1 (or 0) -> 0; 1 -> 1
 
-# Run methods end ---------------------------------------------------------------------------------------------------------------------
+
+    def manchester_decoder(self, signal):
+        bit_pairs = np.ascontiguousarray(as_bits(signal)[:len(signal) // 2 * 2]).view(np.uint16) # one item per pair
+        return (bit_pairs != self.manchester_zero).astype(np.uint8) # [0, 1] -> 0; else 1
+
+
+    def manchester_violations(self, signal):
+        """Number of half bit pairs without a transition ([0, 0] or [1, 1])"""
+        bit_pairs = np.ascontiguousarray(as_bits(signal)[:len(signal) // 2 * 2]).view(np.uint16)
+        return int(np.count_nonzero(np.isin(bit_pairs, self.manchester_invalid)))
+
+
+    def bipolar_decoder(self, signal):
+        return (np.asarray(signal) != 0).astype(np.uint8) # 0 -> 0; (-1, 1) -> 1
+
+
+    def bipolar_levels(self, bits_array):
+        """AMI levels (-1, 0, 1) of the 2 bit pairs sent by the Transmissor and the number of invalid [1, 1] pairs"""
+        bit_pairs = as_bits(bits_array)[:len(bits_array) // 2 * 2].reshape(-1, 2)
+        levels = bit_pairs[:, 0].astype(np.int8) - bit_pairs[:, 1].astype(np.int8) # [1, 0] -> 1; [0, 1] -> -1; [0, 0] and [1, 1] -> 0
+        return levels, int(np.count_nonzero(bit_pairs[:, 0] & bit_pairs[:, 1]))
+
+
+    def ami_violations(self, levels):
+        """Number of marks with the same polarity as the previous one (the first mark must be +1)"""
+        marks = np.asarray(levels)[np.asarray(levels) != 0]
+        return int(np.count_nonzero(marks[1:] == marks[:-1])) + int(len(marks) > 0 and marks[0] < 0)
+
+# Decoding methods end ---------------------------------------------------------------------------------------------------------------------
+
+
+
+# Demodulation methods start ---------------------------------------------------------------------------------------------------------------------
+
+    def demodulate(self, signal, modulation_method, num_bits=None, modulation_params=None):
+        """ Demodulates a whole signal block and records the symbol rate in self.demodulation_stats """
+        modulation = Transmissor.modulation_settings(modulation_params)
+        start = time.perf_counter()
+
+        match modulation_method.lower():
+            case "ask":
+                bits = self.ASK_demodulator(modulation["A"], modulation["f1"], signal, modulation["samples_per_symbol"])
+                num_symbols = len(bits)
+            case "fsk":
+                bits = self.FSK_demodulator(modulation["A"], modulation["f1"], modulation["f2"], signal, modulation["samples_per_symbol"])
+                num_symbols = len(bits)
+            case "8qam":
+                if isinstance(signal, (list, tuple)): # [bauds, tempo, sinal_banda_base] as returned by Transmissor.modulacao_8qam
+                    signal = signal[2]
+                bits = Mod_8qam(modulation["samples_per_symbol"]).demodulacao_8qam(signal)
+                num_symbols = len(bits) // 3
+
+        elapsed = time.perf_counter() - start
+        self.demodulation_stats = {
+            "modulation": modulation_method.lower(),
+            "symbols": num_symbols,
+            "seconds": elapsed,
+            "symbols_per_second": num_symbols / elapsed if elapsed > 0 else float('inf'),
+        }
+
+        if num_bits is not None:
+            bits = bits[:num_bits]
+        return bits
+
+
+    def ASK_demodulator(self, A, f, signal, samples_per_bit=100): # energy detection per bit window
+        windows = np.asarray(signal, dtype=float)[:len(signal) // samples_per_bit * samples_per_bit].reshape(-1, samples_per_bit)
+        carrier = Transmissor.carrier(A, f, samples_per_bit)
+        carrier_energy = carrier @ carrier
+        energy = (windows @ carrier)**2 / carrier_energy # energy of each window along the carrier (noise in other directions is ignored)
+        return (energy > carrier_energy / 4).astype(np.uint8) # bit 1 if the amplitude is above half of a carrier period
+
+
+    def FSK_demodulator(self, A, f1, f2, signal, samples_per_bit=100): # correlation with both carriers
+        windows = np.asarray(signal, dtype=float)[:len(signal) // samples_per_bit * samples_per_bit].reshape(-1, samples_per_bit)
+        correlation_f1 = windows @ Transmissor.carrier(A, f1, samples_per_bit) # bit 1
+        correlation_f2 = windows @ Transmissor.carrier(A, f2, samples_per_bit) # bit 0
+        return (correlation_f1 > correlation_f2).astype(np.uint8)
+
+# Demodulation methods end ---------------------------------------------------------------------------------------------------------------------
 
 
 
 # Framing methods start ---------------------------------------------------------------------------------------------------------------------
 
-    def character_count_deframing(self, bits_array):
-        """Return a matrix of frames without headers"""
+    def character_count_deframing(self, bits_array, header_bytes=1):
+        """Return a list of frames (uint8 bit arrays) without headers"""
         original_frames_matrix = []
         padding_bits_list = []
-        bytes_list = [''.join(map(str, bits_array[i:i+8])) for i in range(0, len(bits_array), 8)] # bytes_list is a array of strings of 8 bits
-
-        while bytes_list:
-            # Convert the header to integer
-            frame_size = int(bytes_list[0], 2)
-
-            padding_bits = int(bytes_list[1], 2)
-            # Remove the header and add the frame to the matrix
-            original_frames_matrix.append(bytes_list[2:frame_size])
+        bits_array = as_bits(bits_array)
+        bytes_values = np.packbits(bits_array) # header walk over the byte values, the frames are views of bits_array
+        header_weights = 256 ** np.arange(header_bytes - 1, -1, -1) # big-endian count header
+        num_bytes = len(bytes_values)
+        position = 0 # index of the current header
+
+        while position + header_bytes < num_bytes:
+            frame_size = int(bytes_values[position:position + header_bytes] @ header_weights) # count header + padding byte + data bytes
+            if frame_size < header_bytes + 1: # corrupted header, the rest of the stream can't be split
+                break
+
+            padding_bits = int(bytes_values[position + header_bytes])
+            original_frames_matrix.append(bits_array[(position + header_bytes + 1)*8:(position + frame_size)*8])
             padding_bits_list.append(padding_bits)
-            # Move to the next frame
-            bytes_list = bytes_list[frame_size:]
-
-        list_str_frames = [''.join(frame) for frame in original_frames_matrix]
+            position += frame_size # next header
 
-        return list_str_frames, padding_bits_list
+        return original_frames_matrix, padding_bits_list
     
 
     def bytes_insertion_deframing(self, bits_array):
-        """Return a matrix of frames without flags"""
+        """Return a list of frames (uint8 bit arrays) without flags and escapes"""
         original_frames_matrix = []
-        frame = []
         padding_bits_list = []
-        bytes_list = [''.join(map(str, bits_array[i:i+8])) for i in range(0, len(bits_array), 8)] # bytes_list is a array of strings of 8 bits
-        flag = '01111110'
+        bytes_values = np.packbits(as_bits(bits_array))
+        flag = 0b01111110
+
+        flags = np.flatnonzero(bytes_values == flag) # every flag position in one pass, the payload has no 0x7E after escaping
+        escapes = np.flatnonzero(bytes_values == 0x7D) # 0x7D only shows up as an escape, the escaped byte is never 0x7D
+        escapes = escapes[escapes + 1 < len(bytes_values)]
+
+        bytes_values = bytes_values.copy()
+        bytes_values[escapes + 1] ^= 0x20 # restore the escaped bytes
+        bytes_values = np.delete(bytes_values, escapes) # and drop the escapes
+        flags = flags - np.searchsorted(escapes, flags) # flag positions after the escapes were removed
+        bits_array = np.unpackbits(bytes_values)
 
-        while bytes_list:
-            byte = bytes_list.pop(0)
-            if byte == flag:
-                if frame:  # if frame is not empty
-                    original_frames_matrix.append(frame[1:])
-                    padding_bits = int(frame[0], 2)
-                    padding_bits_list.append(padding_bits)
-                    frame = []
-            else:
-                frame.append(byte)
+        starts = np.concatenate(([0], flags[:-1] + 1)) # a frame goes from the byte after a flag to the next flag
+        ends = flags
+        non_empty = ends > starts # two flags in a row (end flag + start flag) are not a frame
 
-        list_str_frames = [''.join(frame) for frame in original_frames_matrix]
+        for start, end in zip(starts[non_empty].tolist(), ends[non_empty].tolist()):
+            padding_bits_list.append(int(bytes_values[start])) # first byte is the padding header
+            original_frames_matrix.append(bits_array[(start + 1)*8:end*8])
 
-        return list_str_frames, padding_bits_list
+        return original_frames_matrix, padding_bits_list
 
     
     def bits_insertion_deframing(self, bits_array, crc32=False): 
-        """Return a list of frames(str) without flags"""
+        """Return a list of frames (uint8 bit arrays) without flags, destuffed"""
         original_frames_list = []
-        frame = []
         padding_bits_list = []
-        bits_string = ''.join(map(str, bits_array)) # bits_string is a string of bits
-        flag = '01111110'
-
-        while bits_string:
-            if bits_string.startswith(flag):
-                bits_string = bits_string[len(flag):]  # remove the flag
-                if crc32 and not frame:
-                    padding_bits = int(bits_string[:8], 2)
-                    bits_string = bits_string[8:]
-                    padding_bits_list.append(padding_bits)
-                elif not crc32 and not frame:
+        bits_array = as_bits(bits_array)
+        flag = 0b01111110
+
+        candidates = np.flatnonzero(window_values(bits_array) == flag).tolist() # every position where a flag starts, in one pass
+        cursor = 0 # first bit after the last flag
+        frame_start = None # first bit of the current frame, None between frames
+
+        for position in candidates:
+            if position < cursor: # overlaps the flag just consumed
+                continue
+
+            if frame_start is not None and position > frame_start: # closing flag
+                frame = self.bit_destuffing(bits_array[frame_start:position])
+                if crc32: # the padding header is stuffed together with the frame
+                    padding_bits_list.append(bits_to_int(frame[:8]))
+                    frame = frame[8:]
+                else:
                     padding_bits_list.append(0)
+                original_frames_list.append(frame)
+                frame_start = None
+            else: # opening flag (two flags in a row: the second one opens the next frame)
+                frame_start = position + 8
 
-                if frame:  # if frame is not empty
-                    original_frames_list.append("".join(frame))
-                    frame = []
-            else:
-                frame.append(bits_string[0])
-                bits_string = bits_string[1:]
+            cursor = position + 8
 
         return original_frames_list, padding_bits_list
 
+
+    def bit_destuffing(self, bits_array):
+        """Remove the 0 inserted after every five consecutive 1's"""
+        bits_array = as_bits(bits_array)
+        starts, lengths = runs_of_ones(bits_array)
+        positions = starts[lengths >= 5] + 5 # stuffed runs are at most 5 ones long, the next bit is the inserted 0
+        return np.delete(bits_array, positions[positions < len(bits_array)])
+
 # Framing methods end ---------------------------------------------------------------------------------------------------------------------
     
 
@@ -171,169 +467,44 @@ class Receiver:
 # Error correction or detection methods start ---------------------------------------------------------------------------------------------------------------------
     
     def solve_even_parity(self, frames, padding_bits_list):
-        list_detection_error = []
-        list_bits_cleaned = []
+        frames = [as_bits(frame)[:len(frame) - padding_bits] for frame, padding_bits in zip(frames, padding_bits_list)] # remove the padding bits
+        list_detection_error = (even_parity_frames(frames) != 0).tolist() # data + parity bit must have an even count of ones
+        list_bits_cleaned = [frame[:-1] for frame in frames]
 
-        for frame, padding_bits in zip(frames, padding_bits_list):
-            if padding_bits != 0:
-                frame = frame[:-padding_bits] # remove the padding bits
-
-            bits_array = [int(bit) for bit in frame] # convert the frame to a list of integers
-            count_ones = sum(bits_array[:-1])
-            parity_bit = bits_array[-1]
+        return list_bits_cleaned, list_detection_error
 
-            if (count_ones + parity_bit) % 2 == 0:
-                list_detection_error.append(False)
-            else:
-                list_detection_error.append(True)	
 
-            list_bits_cleaned.extend(bits_array[:-1])		
+    def solve_parity_2d(self, frames, padding_bits_list):
+        frames = [frame[:len(frame) - padding_bits] for frame, padding_bits in zip(frames, padding_bits_list)] # remove the padding bits
+        list_bits_cleaned, list_detection_error = parity_2d_decode_frames(frames) # corrects one error per frame
 
         return list_bits_cleaned, list_detection_error
 
 
 
     def solve_crc32(self, frames, padding_bits_list):
-        def verify_crc32(bit_array):
-            inserted_bits_len = 0
-            crc32_polynomial = 0x104C11DB7 # polynomial used by CRC32 IEEE 802 (0x04C11DB7 without the occlusion of the first bit)
-            crc32_polynomial_str = f"{crc32_polynomial:033b}" # 32 0's to complete the 96 bits
-
-            def xor(bit_str_a, bit_str_b): # xor between two bit strings
-                bit_str_result = ''
-                for i in range(len(bit_str_a)):
-                    if bit_str_a[i] == bit_str_b[i]: # if the bits are equal, the result is 0
-                        bit_str_result += '0'
-                    else: # if the bits are different, the result is 1
-                        bit_str_result += '1'
-                return bit_str_result
-
-            bit_str = ''.join(map(str, bit_array)) # convert the bit array to a bit string
-
-            bit_str = bit_str + '0'*32 # 32 0's to complete the 96 bits     
-            bit_str_to_xor = ''
-            for i in range(len(bit_str)): # for each bit in the bit string
-                if i <= 32: # if the bit is in the first 32 bits
-                    bit_str_to_xor += bit_str[i]
-                else: # if the bit is in the last 64 bits
-                    if bit_str_to_xor[0] == '1':
-                        bit_str_to_xor = xor(bit_str_to_xor, crc32_polynomial_str) # xor with the polynomial
-                        bit_str_to_xor = bit_str_to_xor[1:] + bit_str[i] # exclude the first bit (0) and include the next bit
-                    else:
-                        bit_str_to_xor = bit_str_to_xor[1:] + bit_str[i] # exclude the first bit (0) and include the next bit
-
-                if i == len(bit_str) - 1: # if it is the last bit
-                    if bit_str_to_xor[0] == '1': # if the first bit is 1, xor with the polynomial
-                        bit_str_to_xor = xor(bit_str_to_xor, crc32_polynomial_str)
-                        bit_str_to_xor = bit_str_to_xor[1:] # exclude the first bit (0)
-
-                    else: # if the first bit is 0, xor with 33 0's
-                        bit_str_to_xor = bit_str_to_xor[1:] # exclude the first bit (0)
-
-            if bit_str_to_xor == '0'*32: # if the result is 32 0's, don't have errors
-                return True
-            else: # if the result is not 32 0's, have errors
-                return False
-
-        list_detection_error = []
+        frames = [as_bits(frame) for frame in frames]
+        list_detection_error = (crc32_frames(frames) != 0).tolist() # no remainder, no errors; every frame in one batch
         list_bits_cleaned = []
-        for frame, padding_bits in zip(frames, padding_bits_list):
-            bits_array = [int(bit) for bit in frame] # convert the frame to a list of integers
-            if verify_crc32(bits_array):
-                list_detection_error.append(False)
-            else:
-                list_detection_error.append(True)
-            
-            if padding_bits != 0:
-                list_bits_cleaned.extend(bits_array[:-padding_bits-32]) # remove the padding bits
-            else:
-                list_bits_cleaned.extend(bits_array[:-32]) 
+        for bits_array, padding_bits in zip(frames, padding_bits_list):
+            list_bits_cleaned.append(bits_array[:len(bits_array) - padding_bits - 32]) # remove the padding bits and the CRC
 
         return list_bits_cleaned, list_detection_error
     
-    def solve_hamming(self, frames, padding_bits_list): # Apply the Hamming Code to the provided bit array.
-        def find_len_redundant_bits(bit_array): 
-            """"""
-            len_bit_array = len(bit_array)
-            i = 0
-            while ((2**i) <= len_bit_array):
-                i += 1
-            return i
-
-        def calculate_parity_bit(bit_array, position): # position must be one of the power of 2 (1, 2, 4, 8, 16, ...)
-            """Calculate the parity bit for the given position."""
-            temp_bit_array = bit_array[position-1:]
-            list_of_bits = []
-            jump = False # jump must be started with False to collect the first bits of the bit_array according to the position
-            for i in range(0, len(bit_array), position):
-                if jump:
-                    jump = False
-                    continue
-
-                list_of_bits.extend(temp_bit_array[i:i+position]) # if i+position is greater than the length of the temp_bit_array, it will not be a problem because the slice will be until the end of the list
-                jump = True        
-
-            parity = list_of_bits[0] # The first bit is the parity bit itself
-            list_of_bits = list_of_bits[1:] 
-
-            for bit in list_of_bits:
-                parity ^= bit
-
-            return parity
-                
-        def make_correction(bit_array):
-            """Make the correction of the bit array."""
-            len_redudant_bits = find_len_redundant_bits(bit_array)
-            error_position = 0
-            str_bin_correction = ""
-
-            for i in range(len_redudant_bits):
-                position = (2**i)
-                parity = calculate_parity_bit(bit_array, position)
-                str_bin_correction += str(parity)
-
-            str_bin_correction = str_bin_correction[::-1] # Reverse the string
-
-            print("str_bin_correction",str_bin_correction)
-            error_position = int(str_bin_correction, 2) # Convert the binary string to decimal
-
-            if error_position == 0:
-                print("No error detected")
-
-            else:
-                print(f"Error detected at position {error_position}")
-                error_position -= 1  # Adjusting for 0-based index
-
-                if bit_array[error_position] == 0:
-                    bit_array[error_position] = 1
-                else:
-                    bit_array[error_position] = 0
-            
-            bit_array_corrected_cleaned = []
-            for i in range(len(bit_array)):
-                if (i+1) not in [2**i for i in range(len_redudant_bits)]:
-                    bit_array_corrected_cleaned.append(bit_array[i])
-
-            return bit_array_corrected_cleaned
-        
-
-        list_detection_error = []
-        list_bits_cleaned = []
-        for frame, padding_bits in zip(frames, padding_bits_list):
-            if padding_bits != 0:
-                frame = frame[:-padding_bits] # remove the padding bits
-
-            bits_array = [int(bit) for bit in frame] # convert the frame to a list of integers
-            bits_array_corrected = make_correction(bits_array)
-
-            list_bits_cleaned.extend(bits_array_corrected)	
-            
+    def solve_hamming(self, frames, padding_bits_list, hamming_code="15,11"): # Apply the Hamming Code to the provided bit array.
+        frames = [frame[:len(frame) - padding_bits] for frame, padding_bits in zip(frames, padding_bits_list)] # remove the padding bits
+        list_bits_cleaned, list_detection_error = HAMMING_CODES[hamming_code].decode_frames(frames) # corrects one error per block
 
         return list_bits_cleaned, list_detection_error
 
 # Error correction or detection methods end ---------------------------------------------------------------------------------------------------------------------
 
 
+def decode_message(bits, encoding_method, framing_method, error_correction_or_detection_method, count_header_bytes=1, hamming_code="15,11"):
+    """ Link layer decoding of one message on a fresh Receiver, so executor workers don't share state """
+    return Receiver().run(encoding_method, framing_method, error_correction_or_detection_method, bits=bits, count_header_bytes=count_header_bytes, hamming_code=hamming_code)
+
+
 if __name__ == "__main__":
     transmissor = Transmissor("yan fahfa")
     result = transmissor.run("nrz", "bits_insertion", "hamming", "ask")[0]
@@ -0,0 +1,214 @@
+import math
+import numpy as np
+from transmissor import Transmissor
+from receptor import Receiver
+from channel import Channel
+from hamming import HAMMING_CODES
+from bits import concat_bits
+
+
+COUNT_KEYS = ("channel_bits", "channel_bit_errors", "bits", "bit_errors", "lost_bits", "frames", "frame_errors", "lost_frames", "messages", "message_errors", "detected")
+
+
+def count_bit_errors(sent, received):
+    """ Bits that differ between two bit arrays of the same length (the channel doesn't add or drop bits) """
+    return int(np.count_nonzero(np.asarray(sent, dtype=np.uint8) != np.asarray(received, dtype=np.uint8)))
+
+
+def align_frames(sent_lengths, received_lengths):
+    """ Index of the received frame lined up with each sent frame, -1 for a lost frame
+
+    With as many frames as sent, frame i is aligned if it kept its length. Otherwise frames were merged or split by
+    the deframing: only the frames before the first and after the last length mismatch can be trusted.
+    """
+    sent_count, received_count = len(sent_lengths), len(received_lengths)
+    matches = np.full(sent_count, -1)
+    if sent_count == received_count:
+        kept = np.asarray(sent_lengths) == np.asarray(received_lengths)
+        matches[kept] = np.flatnonzero(kept)
+        return matches
+
+    head = 0
+    while head < min(sent_count, received_count) and sent_lengths[head] == received_lengths[head]:
+        matches[head] = head
+        head += 1
+    tail = 1
+    while tail <= min(sent_count, received_count) - head and sent_lengths[-tail] == received_lengths[-tail]:
+        matches[sent_count - tail] = received_count - tail
+        tail += 1
+    return matches
+
+
+def residual_errors(transmissor, receiver, encoding_method, framing_method, count_header_bytes=1):
+    """ (bit errors, lost bits, frame errors, lost frames) of the payload after decoding
+
+    Bit errors are only counted over the frames received aligned; the payload bits of the other frames are erasures
+    (lost bits), so bit errors + lost bits never exceed the payload bits.
+    """
+    sent_frames = transmissor.frame_payloads(transmissor.frames, framing_method, count_header_bytes) # line coded data of each frame
+    sent_lengths = [len(frame) for frame in sent_frames]
+    matches = align_frames(sent_lengths, [len(frame) for frame in receiver.frames_cleaned])
+
+    # line coded stream as received, with the lost frames left as sent so they don't spread errors to their neighbours
+    received_frames = [receiver.frames_cleaned[match] if match >= 0 else frame for frame, match in zip(sent_frames, matches)]
+    received_bits = receiver.line_decode(concat_bits(received_frames), encoding_method)[0]
+    sent_bits = transmissor.bit_array
+    if not len(sent_bits):
+        return 0, 0, 0, 0
+
+    lost_line_bits = np.repeat(matches < 0, sent_lengths)
+    step = math.gcd(len(sent_bits), len(lost_line_bits)) # line codes have a fixed rate: payload symbol -> line symbol
+    lost = np.repeat(lost_line_bits.reshape(step, -1).any(axis=1), len(sent_bits) // step) # payload bits of lost frames
+
+    wrong = (sent_bits != received_bits[:len(sent_bits)]) & ~lost
+    line_offsets = np.cumsum([0] + sent_lengths)
+    payload_offsets = line_offsets * len(sent_bits) // len(lost_line_bits)
+    frame_errors = sum(bool(wrong[start:end].any()) for start, end, match in zip(payload_offsets[:-1], payload_offsets[1:], matches) if match >= 0)
+    return int(np.count_nonzero(wrong)), int(np.count_nonzero(lost)), frame_errors, int(np.count_nonzero(matches < 0))
+
+
+def simulate_message(payload, encoding_method, framing_method, error_correction_or_detection_method, modulation_method, channel, channel_method, channel_param, frame_size=None, count_header_bytes=1, hamming_code="15,11", modulation_params=None):
+    """ Sends one payload through Transmissor -> channel -> Receiver, modulation_params goes to both sides
+
+    Returns a dict of counts: channel bits and channel bit errors (link bits before any decoding), payload bits, bit
+    errors and lost bits after decoding (see residual_errors), frames, frame errors, lost frames and whether the EDC
+    scheme or the line code found an error.
+    """
+    transmissor = Transmissor(payload)
+    transmissor.run(encoding_method, framing_method, error_correction_or_detection_method, modulation_method, send=False, frame_size=frame_size, count_header_bytes=count_header_bytes, hamming_code=hamming_code, modulation_params=modulation_params)
+    num_bits = len(transmissor.bits_vector)
+
+    receiver = Receiver()
+    match channel_method:
+        case "awgn": # noise on the modulated signal, the receiver demodulates it
+            signal = transmissor.signal
+            if modulation_method.lower() == "8qam":
+                signal = signal[2] # [bauds, tempo, sinal_banda_base]
+            noisy_signal = channel.awgn(signal, channel_param, num_bits)
+            receiver.bits_array = receiver.demodulate(noisy_signal, modulation_method, num_bits, modulation_params)
+        case "bsc": # bit errors on the transmitted bit vector
+            receiver.bits_array = channel.binary_symmetric(transmissor.bits_vector, channel_param)
+        case "gilbert_elliott": # channel_param = (p_good_to_bad, p_bad_to_good, error_good, error_bad)
+            receiver.bits_array = channel.gilbert_elliott(transmissor.bits_vector, *channel_param)
+
+    counts = {
+        "channel_bits": num_bits,
+        "channel_bit_errors": count_bit_errors(transmissor.bits_vector, receiver.bits_array),
+        "bits": len(transmissor.bit_array),
+        "frames": len(transmissor.frames),
+    }
+    try:
+        receiver.run(encoding_method, framing_method, error_correction_or_detection_method, count_header_bytes=count_header_bytes, hamming_code=hamming_code)
+    except (ValueError, IndexError): # framing destroyed by the errors, every frame is lost
+        return {**counts, "bit_errors": 0, "lost_bits": counts["bits"], "frame_errors": 0, "lost_frames": counts["frames"], "detected": True}
+
+    bit_errors, lost_bits, frame_errors, lost_frames = residual_errors(transmissor, receiver, encoding_method, framing_method, count_header_bytes)
+    error_detected = any(receiver.list_error_detec) or receiver.line_code_violations > 0 # EDC or line code (Manchester/AMI) check
+    return {**counts, "bit_errors": bit_errors, "lost_bits": lost_bits, "frame_errors": frame_errors, "lost_frames": lost_frames, "detected": error_detected}
+
+
+def simulate_batch(encoding_method, framing_method, error_correction_or_detection_method, modulation_method, channel_method, point, num_messages, message_bytes, seed, frame_size=None, count_header_bytes=1, hamming_code="15,11", modulation_params=None):
+    """ Runs num_messages random payloads at one grid point and returns the error counts
+
+    seed can be a Generator (shared with the caller) or a SeedSequence (independent stream for a worker process).
+    """
+    rng = np.random.default_rng(seed)
+    channel = Channel(rng)
+    counts = dict.fromkeys(COUNT_KEYS, 0)
+    payloads = rng.integers(0x20, 0x7F, (num_messages, message_bytes), dtype=np.uint8) # printable ascii
+
+    for payload in payloads:
+        message = simulate_message(payload.tobytes(), encoding_method, framing_method, error_correction_or_detection_method, modulation_method, channel, channel_method, point, frame_size, count_header_bytes, hamming_code, modulation_params)
+        for key, value in message.items():
+            counts[key] += value
+        counts["messages"] += 1
+        counts["message_errors"] += message["bit_errors"] + message["lost_bits"] > 0
+
+    return counts
+
+
+def summarize(point, counts):
+    """ Adds the error rates to the counts of a grid point
+
+    channel_ber is the raw BER of the link bits, ber the residual BER of the payload bits that were delivered,
+    erasure_rate the share of payload bits lost with their frames and fer counts both wrong and lost frames.
+    """
+    delivered_bits = counts["bits"] - counts["lost_bits"]
+    return {
+        "point": point,
+        **counts,
+        "channel_ber": counts["channel_bit_errors"] / counts["channel_bits"] if counts["channel_bits"] else 0.0,
+        "ber": counts["bit_errors"] / delivered_bits if delivered_bits else 0.0,
+        "erasure_rate": counts["lost_bits"] / counts["bits"] if counts["bits"] else 0.0,
+        "fer": (counts["frame_errors"] + counts["lost_frames"]) / counts["frames"] if counts["frames"] else 0.0,
+    }
+
+
+def ber_sweep(encoding_method, framing_method, error_correction_or_detection_method, modulation_method, grid, channel_method="awgn", num_messages=100, message_bytes=16, seed=None, frame_size=None, count_header_bytes=1, hamming_code="15,11", modulation_params=None):
+    """ BER/FER of one configuration for each point of the grid (Eb/N0 in dB for awgn, error probability for bsc,
+    (p_good_to_bad, p_bad_to_good, error_good, error_bad) for gilbert_elliott)
+
+    Returns a list of dicts, one per grid point.
+    """
+    rng = np.random.default_rng(seed)
+    results = []
+
+    for point in grid:
+        counts = simulate_batch(encoding_method, framing_method, error_correction_or_detection_method, modulation_method, channel_method, point, num_messages, message_bytes, rng, frame_size, count_header_bytes, hamming_code, modulation_params)
+        results.append(summarize(point, counts))
+
+    return results
+
+
+def overhead_report(configs, frame_sizes, bit_error_rates, message_bytes=1024, count_header_bytes=1, seed=None, hamming_code="15,11"):
+    """ Framing/EDC overhead and expected goodput of each (encoding, framing, error correction/detection) config
+    for each frame size, without running the channel
+
+    efficiency is payload bits / transmitted bits. A frame is delivered when it has no bit errors, or at most one
+    for each hamming block (of the hamming_code code) or parity_2d frame, so goodput = efficiency * P(frame delivered) for each bit error rate of bit_error_rates.
+    Returns a list of dicts sorted by the goodput at the last bit error rate, best first.
+    """
+    rng = np.random.default_rng(seed)
+    payload = rng.integers(0x20, 0x7F, message_bytes, dtype=np.uint8).tobytes()
+    report = []
+
+    for encoding_method, framing_method, error_correction_or_detection_method in configs:
+        for frame_size in frame_sizes:
+            transmissor = Transmissor(payload)
+            try:
+                transmissor.run(encoding_method, framing_method, error_correction_or_detection_method, "ask", send=False, frame_size=frame_size, count_header_bytes=count_header_bytes, hamming_code=hamming_code)
+            except ValueError: # frame_size doesn't fit the count header
+                continue
+
+            payload_bits = len(transmissor.bit_array)
+            sent_bits = len(transmissor.bits_vector)
+            num_frames = len(transmissor.frames_final)
+            bits_per_frame = sent_bits / num_frames
+            efficiency = payload_bits / sent_bits
+            goodput = []
+            for p in bit_error_rates:
+                frame_ok = (1 - p) ** bits_per_frame
+                if error_correction_or_detection_method == "hamming": # one error corrected per block
+                    n = HAMMING_CODES[hamming_code].n
+                    frame_ok = ((1 - p) ** n + n * p * (1 - p) ** (n - 1)) ** (bits_per_frame / n)
+                elif error_correction_or_detection_method == "parity_2d": # one error corrected per frame
+                    frame_ok += bits_per_frame * p * (1 - p) ** (bits_per_frame - 1)
+                goodput.append(efficiency * frame_ok)
+
+            report.append({
+                "config": (encoding_method, framing_method, error_correction_or_detection_method),
+                "frame_size": frame_size,
+                "frames": num_frames,
+                "bits_per_frame": bits_per_frame,
+                "overhead": 1 - efficiency,
+                "efficiency": efficiency,
+                "goodput": dict(zip(bit_error_rates, goodput)),
+            })
+
+    report.sort(key=lambda row: row["goodput"][bit_error_rates[-1]], reverse=True)
+    return report
+
+
+if __name__ == "__main__":
+    for row in ber_sweep("nrz", "bits_insertion", "crc", "fsk", [-4, 0, 4, 8], num_messages=50, seed=0):
+        print(row)
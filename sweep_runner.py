@@ -0,0 +1,92 @@
+import itertools
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
+from simulation import COUNT_KEYS, simulate_batch, summarize
+
+
+class SweepPoint:
+    """ State of one (configuration, grid point) of a parallel sweep """
+    def __init__(self, config, point, seeds):
+        self.config = config # (encoding, framing, error correction/detection, modulation)
+        self.point = point
+        self.seeds = seeds # one SeedSequence per batch, spawned in a fixed order
+        self.next_batch = 0 # next batch index to submit
+        self.completed = {} # batch index -> counts, kept until every earlier batch is merged
+        self.merged_batches = 0
+        self.counts = dict.fromkeys(COUNT_KEYS, 0)
+        self.finished = False
+
+    def merge(self, target_errors):
+        """ Merges completed batches in batch order, so the stopping batch doesn't depend on the completion order """
+        while not self.finished and self.merged_batches in self.completed:
+            for key, value in self.completed.pop(self.merged_batches).items():
+                self.counts[key] += value
+            self.merged_batches += 1
+            if self.counts["bit_errors"] + self.counts["lost_bits"] >= target_errors or self.merged_batches == len(self.seeds): # residual errors and erasures
+                self.finished = True
+                self.completed.clear()
+
+
+def parallel_ber_sweep(configs, grid, channel_method="awgn", target_errors=100, max_messages=10000, batch_messages=50, message_bytes=16, seed=None, max_workers=None, hamming_code="15,11", modulation_params=None):
+    """ BER/FER sweep of every configuration over the grid, spread over worker processes
+
+    Each point runs batches of batch_messages until target_errors payload bits were wrong or lost (see
+    simulation.residual_errors) or max_messages were sent.
+    Batch k of a point always uses the same SeedSequence child, and batches are merged in order, so the results are
+    the same whatever the number of workers.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    num_batches = max(1, math.ceil(max_messages / batch_messages))
+    point_seeds = np.random.SeedSequence(seed).spawn(len(configs) * len(grid))
+
+    points = [SweepPoint(config, point, point_seed.spawn(num_batches))
+              for point_seed, (config, point) in zip(point_seeds, itertools.product(configs, grid))]
+
+    pending = {} # future -> (point, batch index)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        def submit_batches():
+            # round robin over the unfinished points, keeping about two batches per worker in flight
+            while len(pending) < 2 * max_workers:
+                candidates = [p for p in points if not p.finished and p.next_batch < num_batches]
+                if not candidates:
+                    return
+                sweep_point = min(candidates, key=lambda p: p.next_batch)
+                batch = sweep_point.next_batch
+                future = executor.submit(simulate_batch, *sweep_point.config, channel_method, sweep_point.point, batch_messages, message_bytes, sweep_point.seeds[batch], hamming_code=hamming_code, modulation_params=modulation_params)
+                pending[future] = (sweep_point, batch)
+                sweep_point.next_batch += 1
+
+        submit_batches()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                sweep_point, batch = pending.pop(future)
+                if not sweep_point.finished:
+                    sweep_point.completed[batch] = future.result()
+                    sweep_point.merge(target_errors)
+
+            for future, (sweep_point, _) in list(pending.items()): # batches of finished points are not needed anymore
+                if sweep_point.finished and future.cancel():
+                    del pending[future]
+
+            submit_batches()
+
+    results = []
+    for sweep_point in points:
+        encoding_method, framing_method, error_correction_or_detection_method, modulation_method = sweep_point.config
+        results.append({
+            "encoding": encoding_method,
+            "framing": framing_method,
+            "error_correction_or_detection": error_correction_or_detection_method,
+            "modulation": modulation_method,
+            **summarize(sweep_point.point, sweep_point.counts),
+        })
+    return results
+
+
+if __name__ == "__main__":
+    configs = list(itertools.product(["nrz"], ["bits_insertion", "character_count"], ["crc", "hamming"], ["fsk", "8qam"]))
+    for row in parallel_ber_sweep(configs, [4, 8, 12], target_errors=200, max_messages=500, seed=0):
+        print(row)
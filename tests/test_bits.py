@@ -0,0 +1,53 @@
+""" Bit buffer helpers (bits.py) and the streamed input/output of Transmissor and Receiver
+
+Run from the repository root: python -m pytest tests
+"""
+import io
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bits import bytes_to_bits, bits_to_bytes, iter_bytes_to_bits, stream_to_bits, write_bits
+from transmissor import Transmissor
+from receptor import Receiver
+
+
+DATA = np.random.default_rng(0).integers(0, 256, 10_000, dtype=np.uint8).tobytes()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096, 1 << 16])
+def test_stream_to_bits_matches_bytes_to_bits(chunk_size):
+    expected = bytes_to_bits(DATA)
+    assert np.array_equal(stream_to_bits(io.BytesIO(DATA), chunk_size), expected)
+    assert np.array_equal(stream_to_bits(DATA, chunk_size), expected)
+    assert sum(len(chunk) for chunk in iter_bytes_to_bits(DATA, chunk_size)) == len(DATA) * 8
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+def test_write_bits_round_trip(chunk_size):
+    sink = io.BytesIO()
+    assert write_bits(bytes_to_bits(DATA), sink, chunk_size) == len(DATA)
+    assert sink.getvalue() == DATA
+
+
+def test_bits_to_bytes_completes_the_last_byte_with_zeros():
+    assert bits_to_bytes([1, 0, 1]) == b'\xa0'
+
+
+@pytest.mark.parametrize("framing_method", ["character_count", "byte_insertion", "bits_insertion"])
+def test_transmissor_reads_a_file_and_receiver_writes_it(framing_method):
+    from_file = Transmissor(io.BytesIO(DATA))
+    from_bytes = Transmissor(DATA)
+    assert np.array_equal(from_file.bit_array, from_bytes.bit_array)
+
+    from_file.run("nrz", framing_method, "crc", None, send=False)
+    receiver = Receiver()
+    receiver.run("nrz", framing_method, "crc", bits=from_file.bits_vector)
+
+    sink = io.BytesIO()
+    assert receiver.write_message(sink, chunk_size=1000) == len(DATA)
+    assert sink.getvalue() == DATA
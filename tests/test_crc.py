@@ -0,0 +1,61 @@
+""" Character count + CRC round trips: every frame sent must come back, with 1 and 2 byte count headers
+
+Run from the repository root: python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from crc import crc32_bits, crc32_frames
+from transmissor import Transmissor
+from receptor import Receiver
+
+
+def round_trip(payload, frame_size, header_bytes):
+    transmissor = Transmissor(payload)
+    transmissor.run("nrz", "character_count", "crc", None, send=False, frame_size=frame_size, count_header_bytes=header_bytes)
+    receiver = Receiver()
+    text = receiver.run("nrz", "character_count", "crc", bits=transmissor.bits_vector, count_header_bytes=header_bytes)[2]
+    return transmissor, receiver, text
+
+
+@pytest.mark.parametrize("n_bytes, frame_size, header_bytes", [
+    (1, 8, 1),
+    (4096, 8, 1),
+    (4096, 200, 1),
+    (65536, 250, 1), # biggest frames for 1 byte: header + padding byte + 249 data bytes + 4 CRC bytes = 255
+    (4096, 8, 2),
+    (65536, 4000, 2),
+    (65536, 300, 2), # frames over 255 bytes need the 2 byte header
+])
+def test_character_count_crc_round_trip(n_bytes, frame_size, header_bytes):
+    payload = np.random.default_rng(n_bytes + frame_size).integers(0x20, 0x7F, n_bytes, dtype=np.uint8).tobytes()
+    transmissor, receiver, text = round_trip(payload, frame_size, header_bytes)
+
+    data_bytes = frame_size - header_bytes
+    assert len(transmissor.frames_final) == -(-n_bytes // data_bytes) # every chunk is framed
+    assert len(receiver.frames) == len(transmissor.frames_final) # and no frame is lost on the way back
+    assert not any(receiver.list_error_detec)
+    assert text == payload.decode()
+
+
+def test_character_count_crc_detects_errors():
+    payload = b"x" * 1000
+    transmissor = Transmissor(payload)
+    transmissor.run("nrz", "character_count", "crc", None, send=False, frame_size=40, count_header_bytes=2)
+    bits = transmissor.bits_vector.copy()
+    bits[-40] ^= 1 # inside the data of the last frame, the headers stay intact
+
+    receiver = Receiver()
+    receiver.run("nrz", "character_count", "crc", bits=bits, count_header_bytes=2)
+    assert receiver.list_error_detec[-1] and not any(receiver.list_error_detec[:-1])
+
+
+def test_crc32_frames_matches_crc32_bits():
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 2, size, dtype=np.uint8) for size in (0, 1, 7, 8, 33, 64, 1000)]
+    assert crc32_frames(frames).tolist() == [crc32_bits(frame) for frame in frames]
@@ -0,0 +1,153 @@
+""" Flag framing regression tests: payloads and EDC bits that look like a flag must be stuffed and come back intact
+
+Run from the repository root: python -m pytest tests
+"""
+import itertools
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bits import bytes_to_bits, runs_of_ones
+from transmissor import Transmissor
+from receptor import Receiver
+
+
+def round_trip(payload, framing_method, edc, frame_size):
+    transmissor = Transmissor(payload)
+    transmissor.run("nrz", framing_method, edc, "ask", send=False, frame_size=frame_size)
+    receiver = Receiver()
+    receiver.run("nrz", framing_method, edc, bits=transmissor.bits_vector)
+    return transmissor, receiver
+
+
+def longest_run(bits_array):
+    lengths = runs_of_ones(bits_array)[1]
+    return int(lengths.max()) if len(lengths) else 0
+
+
+
+
+# Bit stuffing (bits insertion) start ---------------------------------------------------------------------------------------------------------------------
+
+def ones_at_edges(run, frame_size):
+    """ One frame with run ones at its start and at its end, and the next frame starting with run ones again """
+    frame = np.zeros(frame_size, dtype=np.uint8)
+    frame[:run] = 1
+    frame[-run:] = 1
+    return np.concatenate((frame, frame))
+
+
+@pytest.mark.parametrize("run", [5, 6, 11])
+@pytest.mark.parametrize("frame_size", [24, 32])
+def test_bit_stuffing_runs_at_frame_edges(run, frame_size):
+    transmissor = Transmissor("")
+    receiver = Receiver()
+    data = ones_at_edges(run, frame_size)
+
+    for frame in transmissor.bits_insertion_framing(data, frame_size):
+        stuffed = transmissor.bit_stuffing_frame(frame)
+        assert longest_run(stuffed[8:-8]) <= 5 # no flag between the flags
+        assert longest_run(stuffed[7:-7]) <= 6 # nor across the flags: the payload can't extend one
+        assert np.array_equal(receiver.bit_destuffing(stuffed[8:-8]), frame[8:-8])
+
+
+@pytest.mark.parametrize("payload", [b"\xff" * 16, b"\x7e" * 16, b"\xf8\x1f" * 8, b"\xfc\x3f" * 8, b"\xff\xe0\x07\xff" * 4])
+@pytest.mark.parametrize("edc", ["even_parity", "crc", "hamming"])
+@pytest.mark.parametrize("frame_size", [8, 11, 12, 16, 64])
+def test_bits_insertion_round_trip(payload, edc, frame_size):
+    transmissor, receiver = round_trip(payload, "bits_insertion", edc, frame_size)
+
+    assert len(receiver.frames) == len(transmissor.frames_final)
+    assert not any(receiver.list_error_detec)
+    assert np.array_equal(receiver.bits_cleaned, bytes_to_bits(payload))
+
+
+def test_bits_insertion_crc_padding_header_runs_into_the_data():
+    # 9 bit frames get 7 padding bits: the header 00000111 followed by ones is a flag before stuffing
+    transmissor, receiver = round_trip(b"\xff" * 9, "bits_insertion", "crc", 9)
+    unstuffed = transmissor.adjust_frames_crc(transmissor.frames, "bits_insertion")
+
+    assert longest_run(unstuffed[0][8:-8]) >= 6
+    assert not any(receiver.list_error_detec)
+    assert np.array_equal(receiver.bits_cleaned, bytes_to_bits(b"\xff" * 9))
+
+
+@pytest.mark.parametrize("edc", ["crc", "hamming"])
+def test_bits_insertion_edc_bits_form_a_flag(edc):
+    rng = np.random.default_rng(15)
+    flagged = 0
+
+    for _ in range(40):
+        payload = rng.integers(0, 256, 8, dtype=np.uint8).tobytes()
+        transmissor, receiver = round_trip(payload, "bits_insertion", edc, 32)
+        adjust = transmissor.adjust_frames_crc if edc == "crc" else transmissor.adjust_frames_hamming
+        for frame, protected in zip(transmissor.frames, adjust(transmissor.frames, "bits_insertion")):
+            flagged += longest_run(frame[8:-8]) < 6 <= longest_run(protected[8:-8]) # only the EDC bits make the flag
+
+        assert not any(receiver.list_error_detec)
+        assert np.array_equal(receiver.bits_cleaned, bytes_to_bits(payload))
+
+    assert flagged # the payloads above do put a flag in the EDC bits
+
+# Bit stuffing (bits insertion) end ---------------------------------------------------------------------------------------------------------------------
+
+
+
+
+# Byte stuffing (byte insertion) start ---------------------------------------------------------------------------------------------------------------------
+
+def special_bytes(length):
+    """ Every payload of this length made only of flags (0x7E) and escapes (0x7D) """
+    return [bytes(combination) for combination in itertools.product((0x7E, 0x7D), repeat=length)]
+
+
+@pytest.mark.parametrize("payload", special_bytes(1) + special_bytes(2) + special_bytes(4))
+def test_byte_stuffing_flags_and_escapes_only(payload):
+    transmissor = Transmissor("")
+    receiver = Receiver()
+    flag = bytes_to_bits(b"\x7e")
+    frame = np.concatenate((flag, bytes_to_bits(b"\x00" + payload), flag)) # padding header + payload
+
+    stuffed = np.packbits(transmissor.byte_stuffing_frame(frame))
+    assert len(stuffed) == 2 + 1 + 2 * len(payload) # every payload byte gets an escape
+    assert not np.any(stuffed[1:-1] == 0x7E)
+
+    frames, padding_bits_list = receiver.bytes_insertion_deframing(np.unpackbits(stuffed))
+    assert padding_bits_list == [0]
+    assert np.array_equal(frames[0], bytes_to_bits(payload))
+
+
+@pytest.mark.parametrize("payload", [b"\x7e" * 16, b"\x7d" * 16, b"\x7e\x7d" * 8, b"\x7d\x5e\x7d\x5d" * 4, b"\x7d" + b"\x00" * 14 + b"\x7e"])
+@pytest.mark.parametrize("edc", ["even_parity", "crc", "hamming"])
+@pytest.mark.parametrize("frame_size", [3, 4, 8, 16])
+def test_byte_insertion_round_trip(payload, edc, frame_size):
+    transmissor, receiver = round_trip(payload, "byte_insertion", edc, frame_size)
+
+    assert len(receiver.frames) == len(transmissor.frames_final)
+    assert not any(receiver.list_error_detec)
+    assert np.array_equal(receiver.bits_cleaned, bytes_to_bits(payload))
+
+
+@pytest.mark.parametrize("edc", ["crc", "hamming"])
+def test_byte_insertion_edc_bytes_form_a_flag(edc):
+    rng = np.random.default_rng(16)
+    flagged = 0
+
+    for _ in range(100):
+        payload = rng.integers(0, 256, 6, dtype=np.uint8).tobytes()
+        transmissor, receiver = round_trip(payload, "byte_insertion", edc, 8)
+        adjust = transmissor.adjust_frames_crc if edc == "crc" else transmissor.adjust_frames_hamming
+        for frame, protected in zip(transmissor.frames, adjust(transmissor.frames, "byte_insertion")):
+            data, protected = np.packbits(frame[8:-8]), np.packbits(protected[8:-8])
+            flagged += not np.isin(data, (0x7E, 0x7D)).any() and np.isin(protected, (0x7E, 0x7D)).any() # only the EDC bytes need escapes
+
+        assert not any(receiver.list_error_detec)
+        assert np.array_equal(receiver.bits_cleaned, bytes_to_bits(payload))
+
+    assert flagged # the payloads above do put a flag or an escape in the EDC bytes
+
+# Byte stuffing (byte insertion) end ---------------------------------------------------------------------------------------------------------------------
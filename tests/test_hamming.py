@@ -0,0 +1,96 @@
+""" Hamming codes: every single error is corrected, parity bit errors leave the data alone, (72,64) detects double errors
+
+Run from the repository root: python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from hamming import HammingCode, HAMMING_CODES
+
+
+def random_bits(num_bits, seed):
+    return np.random.default_rng(seed).integers(0, 2, num_bits, dtype=np.uint8)
+
+
+@pytest.mark.parametrize("code_name", list(HAMMING_CODES))
+@pytest.mark.parametrize("num_blocks, tail", [(1, 0), (3, 0), (2, 1), (2, 3)]) # tail data bits in a shortened last block
+def test_single_error_in_every_position(code_name, num_blocks, tail):
+    code = HAMMING_CODES[code_name]
+    data = random_bits(num_blocks * code.k + tail, code.n + tail)
+    code_bits = code.encode(data)
+    assert code.is_valid_length(len(code_bits))
+
+    for position in range(len(code_bits)):
+        received = code_bits.copy()
+        received[position] ^= 1
+        decoded, error = code.decode(received)
+        assert error
+        assert np.array_equal(decoded, data), position
+
+
+@pytest.mark.parametrize("code_name", list(HAMMING_CODES))
+def test_parity_bit_errors_leave_the_data_alone(code_name):
+    code = HAMMING_CODES[code_name]
+    data = random_bits(2 * code.k, 7)
+    blocks = code.encode(data).reshape(-1, code.n)
+
+    for column in range(code.k, code.n): # check bits, and the overall parity bit of the extended code
+        received = blocks.copy()
+        received[1, column] ^= 1
+        decoded, errors, uncorrectable = code.decode_blocks(received)
+        assert np.array_equal(decoded.ravel(), data)
+        assert errors.tolist() == [False, True]
+        assert not uncorrectable.any()
+
+
+def test_72_64_detects_double_errors():
+    code = HAMMING_CODES["72,64"]
+    data = random_bits(code.k, 72)
+    block = code.encode(data).reshape(1, -1)
+    rng = np.random.default_rng(64)
+
+    for _ in range(500):
+        first, second = rng.choice(code.n, 2, replace=False)
+        received = block.copy()
+        received[0, [first, second]] ^= 1
+        decoded, errors, uncorrectable = code.decode_blocks(received)
+        assert errors[0] and uncorrectable[0], (first, second)
+        assert np.array_equal(decoded[0], received[0, :code.k]) # left as received, no third bit flipped
+
+
+def test_clean_frames_have_no_error():
+    for code in HAMMING_CODES.values():
+        data = random_bits(5 * code.k + 1, code.k)
+        decoded, error = code.decode(code.encode(data))
+        assert not error
+        assert np.array_equal(decoded, data)
+
+
+@pytest.mark.parametrize("code_name", list(HAMMING_CODES))
+@pytest.mark.parametrize("tail", ["one bit left", "one bit added", "parity bits added"])
+def test_broken_length_is_flagged_without_losing_the_other_frames(code_name, tail):
+    code = HAMMING_CODES[code_name]
+    data = [random_bits(3 * code.k, seed) for seed in range(3)]
+    frames = [code.encode(frame_data) for frame_data in data]
+    change = {"one bit left": 1 - code.n, "one bit added": 1, "parity bits added": code.n - code.k}[tail] # a tail with no data bit
+    broken = frames[1][:change] if change < 0 else np.concatenate((frames[1], np.ones(change, dtype=np.uint8)))
+    assert not code.is_valid_length(len(broken))
+
+    with pytest.raises(ValueError):
+        code.to_blocks(broken)
+
+    decoded, errors = code.decode_frames([frames[0], broken, frames[2]])
+    assert errors == [False, True, False]
+    assert np.array_equal(decoded[0], data[0]) and np.array_equal(decoded[2], data[2])
+    whole_blocks = len(broken) // code.n
+    assert np.array_equal(decoded[1], data[1][:whole_blocks * code.k]) # the blocks before the break still decode
+
+
+def test_block_sizes():
+    assert [(code.n, code.k) for code in HAMMING_CODES.values()] == [(7, 4), (15, 11), (72, 64)]
+    assert HammingCode(26).n == 31
@@ -0,0 +1,71 @@
+""" Even parity and 2-D parity: single errors anywhere in a frame, parity bit errors and frames with a broken length
+
+Run from the repository root: python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from parity import PARITY_2D_ROW_BITS, even_parity_frames, parity_2d_encode_frames, parity_2d_decode_frames
+
+
+def random_frames(lengths, seed):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 2, length, dtype=np.uint8) for length in lengths]
+
+
+def test_even_parity_frames():
+    frames = random_frames([0, 1, 7, 8, 9, 64, 65], 1)
+    assert even_parity_frames(frames).tolist() == [int(frame.sum()) % 2 for frame in frames]
+
+
+def test_parity_2d_frame_layout():
+    data = random_frames([20], 2)[0]
+    frame = parity_2d_encode_frames([data])[0]
+    assert len(frame) == 20 + 3 + PARITY_2D_ROW_BITS # data + one parity per row (the last one short) + column parities
+    assert np.array_equal(frame[:20], data)
+
+
+@pytest.mark.parametrize("data_bits", [1, 8, 20, 64]) # 1 and 20 end in a short row
+def test_parity_2d_single_error_in_every_position(data_bits):
+    data = random_frames([data_bits], data_bits)[0]
+    frame = parity_2d_encode_frames([data])[0]
+
+    for position in range(len(frame)):
+        received = frame.copy()
+        received[position] ^= 1
+        decoded, errors = parity_2d_decode_frames([received])
+        assert errors == [True]
+        assert np.array_equal(decoded[0], data), position # data bits flipped back, parity bit errors don't touch the data
+
+
+def test_parity_2d_double_error_is_detected():
+    data = random_frames([64], 3)[0]
+    frame = parity_2d_encode_frames([data])[0]
+    frame[[0, 9]] ^= 1 # two rows, two columns: can't be located
+    assert parity_2d_decode_frames([frame])[1] == [True]
+
+
+def test_parity_2d_clean_frames_and_batches():
+    frames = random_frames([0, 1, 8, 13, 64, 100], 4)
+    decoded, errors = parity_2d_decode_frames(parity_2d_encode_frames(frames))
+    assert errors == [False] * len(frames)
+    assert all(np.array_equal(got, sent) for got, sent in zip(decoded, frames))
+    assert parity_2d_decode_frames([]) == ([], [])
+
+
+@pytest.mark.parametrize("change", [1, 10, -8, -26, -75]) # no data length fits these, -75 leaves less than the column parities
+def test_parity_2d_broken_length_is_flagged_without_losing_the_other_frames(change):
+    frames = random_frames([64, 64, 64], 5)
+    encoded = parity_2d_encode_frames(frames)
+    encoded[2][3] ^= 1 # the frame after the broken one is still corrected
+    broken = encoded[1][:change] if change < 0 else np.concatenate((encoded[1], np.ones(change, dtype=np.uint8)))
+
+    decoded, errors = parity_2d_decode_frames([encoded[0], broken, encoded[2]])
+    assert errors == [False, True, True]
+    assert np.array_equal(decoded[0], frames[0]) and np.array_equal(decoded[2], frames[2])
+    assert np.array_equal(decoded[1], broken[:len(decoded[1])]) # leading bits passed through
@@ -0,0 +1,157 @@
+""" Wire format (protocol.py): header round trips, rejected headers and messages over a socket pair
+
+Run from the repository root: python -m pytest tests
+"""
+import os
+import socket
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import protocol
+
+
+BITS = np.random.default_rng(0).integers(0, 2, 1003, dtype=np.uint8) # not a whole number of bytes
+
+
+@pytest.fixture
+def sockets():
+    left, right = socket.socketpair()
+    yield left, right
+    left.close()
+    right.close()
+
+
+def test_header_round_trip():
+    header, payload = protocol.encode_message(BITS, 7, "manchester", "bits_insertion", "crc", "fsk")
+    assert len(header) == protocol.HEADER.size
+    assert len(payload) == (len(BITS) + 7) // 8
+
+    msg_type, sequence, num_bits, payload_len, schemes = protocol.decode_header(header)
+    assert (msg_type, sequence, num_bits, payload_len) == (protocol.MSG_DATA, 7, len(BITS), len(payload))
+    assert schemes[:4] == ("manchester", "bits_insertion", "crc", "fsk")
+
+
+def test_header_without_schemes():
+    header, _ = protocol.encode_message(BITS)
+    assert protocol.decode_header(header)[4][:4] == (None, None, None, None)
+
+
+def test_bad_magic_is_rejected():
+    header = bytearray(protocol.encode_message(BITS)[0])
+    header[:4] = b'XXXX'
+    with pytest.raises(protocol.ProtocolError, match="magic"):
+        protocol.decode_header(bytes(header))
+
+
+def test_bad_version_is_rejected():
+    header = bytearray(protocol.encode_message(BITS)[0])
+    header[4] = protocol.VERSION + 1 # the version byte follows the magic
+    with pytest.raises(protocol.ProtocolError, match="version"):
+        protocol.decode_header(bytes(header))
+
+
+@pytest.mark.parametrize("num_bits, payload_len", [(10, 1), (10, 3), (0, 1)])
+def test_payload_length_must_match_the_bit_count(num_bits, payload_len):
+    header = protocol.encode_header(protocol.MSG_DATA, num_bits, payload_len)
+    with pytest.raises(protocol.ProtocolError, match="payload"):
+        protocol.decode_header(header)
+
+
+def test_ack_with_payload_is_rejected():
+    with pytest.raises(protocol.ProtocolError):
+        protocol.decode_header(protocol.encode_header(protocol.MSG_ACK, 10, 2))
+
+
+def test_unknown_message_type_is_rejected():
+    with pytest.raises(protocol.ProtocolError):
+        protocol.decode_header(protocol.encode_header(99, 0, 0))
+
+
+def test_message_over_a_socket(sockets):
+    left, right = sockets
+    protocol.send_message(left, BITS, 3, "nrz", "character_count", "hamming", "ask")
+    protocol.send_message(left, BITS[:0], 4) # empty message, no payload
+    protocol.send_ack(left, len(BITS), 3)
+
+    message = protocol.recv_message(right)
+    assert message.msg_type == protocol.MSG_DATA and message.sequence == 3
+    assert np.array_equal(message.bits, BITS)
+    assert (message.encoding_method, message.framing_method, message.error_correction_or_detection_method, message.modulation_method) == ("nrz", "character_count", "hamming", "ask")
+
+    empty = protocol.recv_message(right)
+    assert empty.sequence == 4 and len(empty.bits) == 0
+
+    ack = protocol.recv_message(right)
+    assert ack.msg_type == protocol.MSG_ACK and ack.sequence == 3 and ack.bits == len(BITS)
+
+
+def test_connection_closed_inside_a_message(sockets):
+    left, right = sockets
+    header, payload = protocol.encode_message(BITS)
+    left.sendall(header + payload.tobytes()[:10])
+    left.close()
+    with pytest.raises(ConnectionError):
+        protocol.recv_message(right)
+
+
+# Persistent connections: StreamDecoder and the pipelined acks of Transmissor ------------------------------------------------
+
+def stream_of(*bit_arrays):
+    return b''.join(header + payload.tobytes() for header, payload in (protocol.encode_message(bits, sequence) for sequence, bits in enumerate(bit_arrays)))
+
+
+def test_stream_decoder_one_byte_at_a_time():
+    messages = [BITS, BITS[:5], BITS[:0], BITS[::-1]]
+    data = stream_of(*messages)
+    decoder = protocol.StreamDecoder()
+
+    received = []
+    for i in range(len(data)):
+        received += decoder.feed(data[i:i + 1])
+    assert [message.sequence for message in received] == [0, 1, 2, 3]
+    assert all(np.array_equal(message.bits, bits) for message, bits in zip(received, messages))
+    assert decoder.pending_bytes() == 0
+
+
+def test_stream_decoder_many_messages_in_one_chunk_and_a_partial_one():
+    data = stream_of(BITS, BITS, BITS)
+    decoder = protocol.StreamDecoder()
+    cut = len(data) - 10
+
+    assert len(decoder.feed(data[:cut])) == 2 # the third one is still missing 10 bytes
+    assert decoder.pending_bytes() == cut - 2 * (len(data) // 3)
+    assert [message.sequence for message in decoder.feed(data[cut:])] == [2]
+
+
+def test_stream_decoder_rejects_a_bad_header():
+    with pytest.raises(protocol.ProtocolError):
+        protocol.StreamDecoder().feed(b'\x55' * 100)
+
+
+def test_wait_ack_checks_the_sequence(sockets):
+    from transmissor import Transmissor
+    left, right = sockets
+    transmissor = Transmissor("")
+    transmissor.session_socket = left
+    transmissor.window = 2
+
+    transmissor.send_pipelined(BITS)
+    transmissor.send_pipelined(BITS)
+    protocol.send_ack(right, len(BITS), 0)
+    protocol.send_ack(right, len(BITS), 1)
+    protocol.send_ack(right, len(BITS), 1) # out of order for message 2
+
+    acks = transmissor.send_pipelined(BITS) # the window is full: waits for the ack of message 0
+    assert [ack.sequence for ack in acks] == [0]
+    assert transmissor.wait_ack().sequence == 1
+    with pytest.raises(protocol.ProtocolError, match="expected ack 2"):
+        transmissor.wait_ack()
+
+    decoder = protocol.StreamDecoder() # the three messages went out with sequences 0, 1, 2
+    right.setblocking(False)
+    received = decoder.feed(right.recv(1 << 16))
+    assert [message.sequence for message in received] == [0, 1, 2]
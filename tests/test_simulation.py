@@ -0,0 +1,44 @@
+""" BER/FER counting: frames are lined up before comparing, lost frames are erasures, errors never exceed the payload
+
+Run from the repository root: python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from simulation import align_frames, ber_sweep
+
+
+@pytest.mark.parametrize("sent, received, expected", [
+    ([8, 8, 8], [8, 8, 8], [0, 1, 2]),
+    ([8, 8, 8], [8, 7, 8], [0, -1, 2]), # one frame lost bits, its neighbours stay aligned
+    ([8, 8, 4], [8, 12], [0, -1, -1]), # two frames merged
+    ([8, 6, 4], [8, 3, 3, 4], [0, -1, 3]), # one frame split, the last one still lines up from the end
+    ([8, 8], [], [-1, -1]),
+])
+def test_align_frames(sent, received, expected):
+    assert align_frames(sent, received).tolist() == expected
+
+
+def test_clean_channel_has_no_errors():
+    row = ber_sweep("manchester", "bits_insertion", "crc", None, [0.0], channel_method="bsc", num_messages=5, seed=0)[0]
+    assert row["channel_bit_errors"] == row["bit_errors"] == row["lost_bits"] == row["lost_frames"] == 0
+    assert row["ber"] == row["fer"] == row["channel_ber"] == 0.0
+
+
+@pytest.mark.parametrize("encoding_method", ["nrz", "4b5b", "8b10b"])
+@pytest.mark.parametrize("framing_method", ["character_count", "byte_insertion", "bits_insertion"])
+def test_errors_never_exceed_the_payload(encoding_method, framing_method):
+    for row in ber_sweep(encoding_method, framing_method, "even_parity", None, [0.01, 0.1, 0.3], channel_method="bsc", num_messages=10, seed=1):
+        assert row["bit_errors"] + row["lost_bits"] <= row["bits"]
+        assert row["frame_errors"] + row["lost_frames"] <= row["frames"]
+        assert 0.0 <= row["ber"] <= 1.0 and 0.0 <= row["fer"] <= 1.0
+
+
+def test_channel_ber_is_reported_separately():
+    row = ber_sweep("nrz", "bits_insertion", "even_parity", "ask", [0], num_messages=20, seed=0)[0]
+    assert 0.15 < row["channel_ber"] < 0.35 # demodulated link bits at 0 dB, before any decoding
+    assert row["erasure_rate"] > 0.9 # 64 bit frames don't survive that
@@ -1,76 +1,124 @@
 import numpy as np
 import socket
-import pickle
+import logging
+from collections import deque
 from mod_8qam import Mod_8qam
+from crc import crc32_frames
+from hamming import HAMMING_CODES
+from parity import even_parity_frames, parity_2d_encode_frames
+from line_codes import encode_4b5b, encode_8b10b, encode_scrambled_nrzi
+from profiling import RunStats
+import protocol
+from bits import as_bits, concat_bits, bytes_to_bits, stream_to_bits, int_to_bits, runs_of_ones
+
+
+logger = logging.getLogger(__name__)
 
 
 class Transmissor:
+    manchester_table = np.array([[0, 1], [1, 0]], dtype=np.int8) # bit -> pair of half bit levels
+    manchester_pairs = manchester_table.view(np.int16).ravel() # each row as one 2 byte item, one gather per bit
+    bipolar_pairs = np.array([[0, 1], [0, 0], [1, 0]], dtype=np.uint8).view(np.int16).ravel() # AMI level + 1 -> 2 bits on the link
+    modulation_defaults = {"A": 1, "f1": 1, "f2": 2, "samples_per_symbol": 100} # both sides must use the same values, see modulation_settings
+    default_frame_sizes = {"character_count": 8, "byte_insertion": 8, "bits_insertion": 64} # bytes (header included), bytes (flags included), bits
     def __init__(self, received_text: str, host='127.0.0.1', port=65432):
         self.host = host
         self.port = port
         self.received_text = received_text
         self.bit_array = self.__text_2_binary(received_text)
+        self.session_socket = None # persistent connection, see open_session
+        self.window = 8
+        self.next_sequence = 0
+        self.unacked = deque() # sequence numbers sent and not acknowledged yet
 
 
     def __text_2_binary(self, text):
-        """ Converts text to binary """
-        bits_str = ''
-        for byte in text.encode('utf8'):
-            byte = f'{byte:08b}' # convert byte to a byte string 
-            bits_str += byte
-        return [int(bit) for bit in bits_str] # returns a list of bits
+        """ Converts text, raw bytes or a binary file-like object (read in chunks) to binary """
+        if hasattr(text, 'read'):
+            return stream_to_bits(text)
+        data = text.encode('utf8') if isinstance(text, str) else text
+        return bytes_to_bits(data) # returns a uint8 bit array, 8 bits per byte
     
 
 
 
 # Run methods start ---------------------------------------------------------------------------------------------------------------------
 
-    def run(self, encoding_method, framing_method, error_correction_or_detection_method,  modulation_method):
-        self.encoded_bits = self.coder(encoding_method)
+    def run(self, encoding_method, framing_method, error_correction_or_detection_method,  modulation_method, send=True, frame_size=None, count_header_bytes=1, hamming_code="15,11", hook=None, trace_memory=False, modulation_params=None):
+        """ Stage timings go to self.run_stats (see profiling.RunStats), hook(run_stats) is called at the end
+
+        modulation_params overrides modulation_defaults (amplitude, carrier frequencies, samples per symbol), the
+        Receiver must get the same ones.
+        """
+        self.schemes = (encoding_method, framing_method, error_correction_or_detection_method, modulation_method, count_header_bytes, hamming_code) # sent in the message header
+        if frame_size is None:
+            frame_size = self.default_frame_sizes[framing_method.lower()]
+        self.check_frame_size(framing_method, frame_size, count_header_bytes)
+        modulation = self.modulation_settings(modulation_params)
+        with RunStats("transmissor", hook, trace_memory) as stats: # stops tracemalloc even if a stage raises
+            self.run_stats = stats
+
+            with stats.stage("coder", self.bit_array) as stage:
+                self.encoded_bits = self.coder(encoding_method)
+
+                match encoding_method.lower():
+                    case "nrz":	# -1 -> 0; 1 -> 1
+                        self.encoded_bits_cleaned = (self.encoded_bits == 1).astype(np.uint8)
+                    case "bipolar":	# 0 -> [0, 0]; 1 -> [1, 0]; -1 -> [0, 1], the polarity goes on the link so AMI violations can be found
+                        self.encoded_bits_cleaned = self.bipolar_pairs[self.encoded_bits + 1].view(np.uint8)
+                    case "manchester" | "4b5b" | "8b10b" | "scrambled_nrzi":	# 0 -> 0; 1 -> 1
+                        self.encoded_bits_cleaned = self.encoded_bits.astype(np.uint8)
+                stage.output(self.encoded_bits_cleaned)
+
+
+            with stats.stage("framing", self.encoded_bits_cleaned) as stage:
+                match framing_method.lower():
+                    case "character_count":
+                        self.frames = self.character_count_framing(self.encoded_bits_cleaned, frame_size, count_header_bytes)
+                    case "byte_insertion":
+                        self.frames = self.bytes_insertion_framing(self.encoded_bits_cleaned, frame_size)
+                    case "bits_insertion":
+                        self.frames = self.bits_insertion_framing(self.encoded_bits_cleaned, frame_size)
+                stage.output(self.frames)
 
         
-
-        match encoding_method.lower():
-            case "nrz":	# -1 -> 0; 1 -> 1
-                self.encoded_bits_cleaned = [0 if bits != 1 else 1 for bits in self.encoded_bits]
-            case "bipolar":	# 0 -> 0; (-1,1) -> 1
-                self.encoded_bits_cleaned = [0 if (bits == 0) else 1 for bits in self.encoded_bits]
-            case "manchester":	# 0 -> 0; 1 -> 1
-                self.encoded_bits_cleaned = self.encoded_bits
-
-
-
-        match framing_method.lower():
-            case "character_count":
-                self.frames = self.character_count_framing(self.encoded_bits_cleaned, 8)
-            case "byte_insertion":
-                self.frames = self.bytes_insertion_framing(self.encoded_bits_cleaned, 8)
-            case "bits_insertion":
-                self.frames = self.bits_insertion_framing(self.encoded_bits_cleaned, 64) # 64 bits (8 bytes) per frame
-
-        
-        match error_correction_or_detection_method.lower():
-            case "even_parity":
-                self.frames_final = self.adjust_frames_even_parity(self.frames, framing_method)
-            case "crc":
-                self.frames_final = self.adjust_frames_crc(self.frames, framing_method)
-            case "hamming":
-                self.frames_final = self.adjust_frames_hamming(self.frames, framing_method)
-
-        print(self.frames_final)
-        bits_vector = [bit for frame in self.frames_final for bit in frame] # convert the frames matrix to a big bit vector
-        match modulation_method.lower():
-            case "ask":
-                self.signal = self.ASK(1, 1, bits_vector)
-            case "fsk":
-                self.signal = self.FSK(1, 1, 2, bits_vector)
-            case "8qam":
-                self.signal = self.modulacao_8qam(bits_vector)
-        
-
-        bits_vector_str = ''.join(map(str, bits_vector))
-
-        self.send_message(bits_vector_str)
+            with stats.stage("edc", self.frames) as stage:
+                match error_correction_or_detection_method.lower():
+                    case "even_parity":
+                        self.frames_final = self.adjust_frames_even_parity(self.frames, framing_method, count_header_bytes)
+                    case "crc":
+                        self.frames_final = self.adjust_frames_crc(self.frames, framing_method, count_header_bytes)
+                    case "hamming":
+                        self.frames_final = self.adjust_frames_hamming(self.frames, framing_method, count_header_bytes, hamming_code)
+                    case "parity_2d":
+                        self.frames_final = self.adjust_frames_parity_2d(self.frames, framing_method, count_header_bytes)
+                stage.output(self.frames_final)
+
+            with stats.stage("stuffing", self.frames_final) as stage:
+                match framing_method.lower(): # stuffing goes after the EDC, so no flag shows up inside a frame
+                    case "byte_insertion":
+                        self.frames_final = [self.byte_stuffing_frame(frame) for frame in self.frames_final]
+                    case "bits_insertion":
+                        self.frames_final = [self.bit_stuffing_frame(frame) for frame in self.frames_final]
+                self.bits_vector = bits_vector = concat_bits(self.frames_final) # convert the list of frames to a big bit vector
+                stage.output(bits_vector)
+            logger.debug("frames: %s", self.frames_final)
+
+            self.signal = None
+            if modulation_method: # None stops at the link layer (bits_vector), for simulations and benchmarks
+                with stats.stage("modulation", bits_vector):
+                    match modulation_method.lower():
+                        case "ask":
+                            self.signal = self.ASK(modulation["A"], modulation["f1"], bits_vector, modulation["samples_per_symbol"])
+                        case "fsk":
+                            self.signal = self.FSK(modulation["A"], modulation["f1"], modulation["f2"], bits_vector, modulation["samples_per_symbol"])
+                        case "8qam":
+                            self.signal = self.modulacao_8qam(bits_vector, modulation["samples_per_symbol"])
+
+
+            if send: # simulations feed the signal to a channel instead of the socket
+                with stats.stage("send", bits_vector):
+                    self.send_message(bits_vector)
 
         return self.bit_array, self.encoded_bits, self.signal
 
@@ -82,192 +130,82 @@ class Transmissor:
 
 # Adjust frames methods start ---------------------------------------------------------------------------------------------------------------------
 
-    def adjust_frames_even_parity(self, frames, framing_method):
-        """ Add even parity bit to each frame """
-        match framing_method.lower():
-            case "character_count":
-                new_frames = []
-                for frame in frames:
-                    unified_frame_array = [int(bit) for bit in ''.join(frame[1:])] # convert the frame to a bit array
-                    frame_with_parity = self.add_even_parity_bit(unified_frame_array) # add parity bit to the frame
-
-                    remainder = len(frame_with_parity) % 8 # calculate the remainder of the division by 8
-                    padding_needed = 8 - remainder # calculate the number of padding bits needed to make the frame size a multiple of 8
-                    padding_bits = padding_needed % 8 # if the remainder is 0 or 8, no padding is needed
-
-                    padded_frame = frame_with_parity + [0] * padding_bits
-
-                    padding_header = [int(bit) for bit in f"{padding_bits:08b}"] # creates a header to indicate how many padding bits were added
-
-                    byte_count = len(padded_frame) // 8 # calculate the number of bytes in the frame
-                    frame_header = [int(bit) for bit in f"{byte_count+2:08b}"] # update the byte count header
-
-                    new_frame = frame_header + padding_header + padded_frame # remove the first byte (byte count header) and combine everything in a new frame
-                    new_frames.append(new_frame)
-
-                return new_frames # returns a list of a frame list of int(bits)
-            
-
-            case "byte_insertion":
-                new_frames = []
-
-                for frame in frames:
-                    flag_init = [int(bit) for bit in frame[0]]
-                    flag_end = [int(bit) for bit in frame[-1]]
-
-                    unified_frame_array = [int(bit) for bit in ''.join(frame[1:-1])]
-                    frame_with_parity = self.add_even_parity_bit(unified_frame_array)
-
-                    remainder = len(frame_with_parity) % 8
-                    padding_needed = 8 - remainder
-                    padding_bits = padding_needed % 8
-
-                    padded_frame = frame_with_parity + [0] * padding_bits
-
-                    padding_header = [int(bit) for bit in f"{padding_bits:08b}"]
-
-                    new_frame = flag_init + padding_header + padded_frame + flag_end
-                    new_frames.append(new_frame)
-
-                return new_frames # returns a list of a frame list of int(bits)
-            
-
-            case "bits_insertion":
-                new_frames = []
-
-                for frame in frames:
-                    flag_init = [int(bit) for bit in frame[:8]]
-                    flag_end = [int(bit) for bit in frame[-8:]]
-
-                    unified_frame_array = [int(bit) for bit in ''.join(frame[8:-8])]
-                    frame_with_parity = self.add_even_parity_bit(unified_frame_array)
-
-                    new_frame = flag_init + frame_with_parity  + flag_end
-                    new_frames.append(new_frame)
-                
-                return new_frames # returns a list of a frame list of int(bits)
-
-
-
-    def adjust_frames_crc(self, frames, framing_method):
-
-        match framing_method.lower():
-            case "character_count":
-                new_frames = []
-                for frame in frames:
-                    unified_frame_array = [int(bit) for bit in ''.join(frame[1:])]
-                    frame_with_crc, inserted_bits_len = self.crc32(unified_frame_array)
-
-                padding_header = [int(bit) for bit in f"{inserted_bits_len:08b}"] # creates a header to indicate how many padding bits were added
-
-                byte_count = len(frame_with_crc) // 8 # calculate the number of bytes in the frame
-                frame_header = [int(bit) for bit in f"{byte_count+2:08b}"] # update the byte count header, +1 to count the header
-
-                new_frame = frame_header + padding_header + frame_with_crc # remove the first byte (byte count header) and combine everything in a new frame
-                new_frames.append(new_frame)
-
-                return new_frames # returns a list of a frame list of int(bits)
-            
-
-            case "byte_insertion":
-                new_frames = []
-
-                for frame in frames:
-                    flag_init = [int(bit) for bit in frame[0]]
-                    flag_end = [int(bit) for bit in frame[-1]]
-
-                    unified_frame_array = [int(bit) for bit in ''.join(frame[1:-1])]
-                    frame_with_crc, inserted_bits_len = self.crc32(unified_frame_array)
-
-                    padding_header = [int(bit) for bit in f"{inserted_bits_len:08b}"]
-
-                    new_frame = flag_init + padding_header + frame_with_crc + flag_end
-                    new_frames.append(new_frame)
-
-                return new_frames # returns a list of a frame list of int(bits)
-            
-
-            case "bits_insertion":
-                new_frames = []
-
-                for frame in frames:
-                    flag_init = [int(bit) for bit in frame[:8]]
-                    flag_end = [int(bit) for bit in frame[-8:]]
-
-                    unified_frame_array = [int(bit) for bit in ''.join(frame[8:-8])]
-                    frame_with_crc, inserted_bits_len = self.crc32(unified_frame_array)
-
-                    padding_header = [int(bit) for bit in f"{inserted_bits_len:08b}"]
-
-                    new_frame = flag_init + padding_header + frame_with_crc + flag_end
-                    new_frames.append(new_frame)
-
-                return new_frames # returns a list of a frame list of int(bits)
-            
-
-
-    def adjust_frames_hamming(self, frames, framing_method):
-
+    def frame_payloads(self, frames, framing_method, header_bytes=1):
+        """ Frame bits without the byte count header or the flags """
         match framing_method.lower():
             case "character_count":
-                new_frames = []
-                for frame in frames:
-                    unified_frame_array = [int(bit) for bit in ''.join(frame[1:])]
-                    frame_with_hamming = self.apply_hamming_code(unified_frame_array)
-
-                    remainder = len(frame_with_hamming) % 8
-                    padding_needed = 8 - remainder
-                    padding_bits = padding_needed % 8
+                return [frame[8*header_bytes:] for frame in frames]
+            case "byte_insertion" | "bits_insertion":
+                return [frame[8:-8] for frame in frames]
 
-                    padded_frame = frame_with_hamming + [0] * padding_bits
 
-                    padding_header = [int(bit) for bit in f"{padding_bits:08b}"] # creates a header to indicate how many padding bits were added
+    def rebuild_frames(self, frames, coded_payloads, framing_method, header_bytes=1):
+        """ Put each coded payload back in its frame, padded to whole bytes with a padding header for character count and byte insertion """
+        new_frames = []
+        for frame, coded_payload in zip(frames, coded_payloads):
+            padding_bits = -len(coded_payload) % 8 # padding bits needed to make the frame size a multiple of 8
+            padded_frame = np.concatenate((coded_payload, np.zeros(padding_bits, dtype=np.uint8)))
+            padding_header = int_to_bits(padding_bits) # creates a header to indicate how many padding bits were added
 
+            match framing_method.lower():
+                case "character_count":
                     byte_count = len(padded_frame) // 8 # calculate the number of bytes in the frame
-                    frame_header = [int(bit) for bit in f"{byte_count+2:08b}"] # update the byte count header
+                    frame_header = self.count_header(byte_count, header_bytes) # update the byte count header
+                    new_frame = np.concatenate((frame_header, padding_header, padded_frame))
+                case "byte_insertion":
+                    new_frame = np.concatenate((frame[:8], padding_header, padded_frame, frame[-8:]))
+                case "bits_insertion": # frames don't need whole bytes
+                    new_frame = np.concatenate((frame[:8], coded_payload, frame[-8:]))
+            new_frames.append(new_frame)
 
-                    new_frame = frame_header + padding_header + padded_frame # remove the first byte (byte count header) and combine everything in a new frame
-                    new_frames.append(new_frame)
+        return new_frames # returns a list of frames (uint8 bit arrays)
 
-                return new_frames # returns a list of a frame list of int(bits)
-            
 
-            case "byte_insertion":
-                new_frames = []
+    def adjust_frames_even_parity(self, frames, framing_method, header_bytes=1):
+        """ Add even parity bit to each frame, the parity of all frames comes from one reduction """
+        payloads = self.frame_payloads(frames, framing_method, header_bytes)
+        parity_bits = even_parity_frames(payloads)
+        frames_with_parity = [np.append(payload, parity_bit) for payload, parity_bit in zip(payloads, parity_bits)]
+        return self.rebuild_frames(frames, frames_with_parity, framing_method, header_bytes)
 
-                for frame in frames:
-                    flag_init = [int(bit) for bit in frame[0]]
-                    flag_end = [int(bit) for bit in frame[-1]]
 
-                    unified_frame_array = [int(bit) for bit in ''.join(frame[1:-1])]
-                    frame_with_hamming = self.apply_hamming_code(unified_frame_array)
+    def adjust_frames_parity_2d(self, frames, framing_method, header_bytes=1):
+        """ Add row and column parity bits to each frame (see parity.py), one error corrected per frame """
+        payloads = self.frame_payloads(frames, framing_method, header_bytes)
+        return self.rebuild_frames(frames, parity_2d_encode_frames(payloads), framing_method, header_bytes)
 
-                    remainder = len(frame_with_hamming) % 8
-                    padding_needed = 8 - remainder
-                    padding_bits = padding_needed % 8
 
-                    padded_frame = frame_with_hamming + [0] * padding_bits
 
-                    new_frame = flag_init + padded_frame + flag_end
-                    new_frames.append(new_frame)
+    def adjust_frames_crc(self, frames, framing_method, header_bytes=1):
+        """ Add CRC32 to each frame, the CRCs of all frames are computed in one batch """
+        payloads = self.frame_payloads(frames, framing_method, header_bytes)
+        padded_payloads, inserted_bits_lens = zip(*map(self.crc32_padding, payloads)) if payloads else ((), ())
+        crcs = crc32_frames(padded_payloads)
+        crc_bits = np.unpackbits(crcs.astype('>u4').view(np.uint8).reshape(-1, 4), axis=1) # one 32 bit row per frame
 
-                return new_frames # returns a list of a frame list of int(bits)
-            
+        new_frames = []
+        for frame, padded_payload, inserted_bits_len, crc in zip(frames, padded_payloads, inserted_bits_lens, crc_bits):
+            frame_with_crc = np.concatenate((padded_payload, crc))
+            padding_header = int_to_bits(inserted_bits_len) # creates a header to indicate how many padding bits were added
 
-            case "bits_insertion":
-                new_frames = []
+            match framing_method.lower():
+                case "character_count":
+                    byte_count = len(frame_with_crc) // 8 # calculate the number of bytes in the frame
+                    frame_header = self.count_header(byte_count, header_bytes) # update the byte count header, counting the headers
+                    new_frame = np.concatenate((frame_header, padding_header, frame_with_crc))
+                case "byte_insertion" | "bits_insertion":
+                    new_frame = np.concatenate((frame[:8], padding_header, frame_with_crc, frame[-8:]))
+            new_frames.append(new_frame)
 
-                for frame in frames:
-                    flag_init = [int(bit) for bit in frame[:8]]
-                    flag_end = [int(bit) for bit in frame[-8:]]
+        return new_frames # returns a list of frames (uint8 bit arrays)
 
-                    unified_frame_array = [int(bit) for bit in ''.join(frame[8:-8])]
-                    frame_with_hamming = self.apply_hamming_code(unified_frame_array)
 
-                    new_frame = flag_init + frame_with_hamming + flag_end
-                    new_frames.append(new_frame)
 
-                return new_frames # returns a list of a frame list of int(bits)
+    def adjust_frames_hamming(self, frames, framing_method, header_bytes=1, hamming_code="15,11"):
+        """ Encode each frame with a Hamming block code (see HAMMING_CODES), one error corrected per block """
+        payloads = self.frame_payloads(frames, framing_method, header_bytes)
+        frames_with_hamming = [self.apply_hamming_code(payload, hamming_code) for payload in payloads]
+        return self.rebuild_frames(frames, frames_with_hamming, framing_method, header_bytes)
 
 # Adjust frames methods end ---------------------------------------------------------------------------------------------------------------------
 
@@ -280,36 +218,42 @@ class Transmissor:
             case "nrz":
                 return self.polar_nrz_coder(self.bit_array)
             case "manchester":
-                print("bits_cleanded transmissor", self.bit_array)
-                print()
-                print()
+                logger.debug("bits before manchester: %s", self.bit_array)
                 return self.manchester_coder(self.bit_array)
             case "bipolar":
                 return self.bipolar_coder(self.bit_array)
+            case "4b5b":
+                return self.block_4b5b_coder(self.bit_array)
+            case "8b10b":
+                return self.block_8b10b_coder(self.bit_array)
+            case "scrambled_nrzi":
+                return self.scrambled_nrzi_coder(self.bit_array)
         
 
     def polar_nrz_coder(self, bit_array):
-        output = [bit if bit == 1 else -1 for bit in bit_array]
-        return output
+        return 2 * as_bits(bit_array).astype(np.int8) - 1 # line coded signal (-1, 1)
 
     
     def manchester_coder(self, bit_array): 
-        output = [[0, 1] if bit == 0 else [1, 0] for bit in bit_array]
-        output = [bit for two_bit_list in output for bit in two_bit_list]
-        return output
+        return self.manchester_pairs[as_bits(bit_array)].view(np.int8) # 0 -> [0, 1]; 1 -> [1, 0]
     
 
     def bipolar_coder(self, bit_array):
-        output = bit_array.copy()
-        flip = False
-        for i, bit in enumerate(output):
-            if bit == 1 and not flip:
-                output[i] = 1
-                flip = not flip
-            elif bit == 1 and flip:
-                output[i] = -1
-                flip = not flip
-        return output
+        bit_array = as_bits(bit_array)
+        odd_one = np.cumsum(bit_array, dtype=np.uint8) & 1 # 1 on the 1st, 3rd, 5th... one; uint8 wraps at 256, the parity survives
+        return bit_array.astype(np.int8) * (2 * odd_one.astype(np.int8) - 1) # ones alternate between 1 and -1, starting with 1
+
+
+    def block_4b5b_coder(self, bit_array):
+        return encode_4b5b(bit_array) # 10 bits per byte from a byte table, completed to whole bytes
+
+
+    def block_8b10b_coder(self, bit_array):
+        return encode_8b10b(bit_array) # DC balanced, running disparity starts at -1
+
+
+    def scrambled_nrzi_coder(self, bit_array):
+        return encode_scrambled_nrzi(bit_array) # same length, the scrambler keeps transitions on long runs of 0's
 
 # Enconding methods end ---------------------------------------------------------------------------------------------------------------------
     
@@ -317,170 +261,129 @@ class Transmissor:
 
 # Framing methods start ---------------------------------------------------------------------------------------------------------------------
 
-    def character_count_framing(self, bits_array, max_frame_size): # limit of max_frame_size is 256
-        """Return a matrix of frames, each frame is a list of strings of 8 bits"""
+    def check_frame_size(self, framing_method, frame_size, header_bytes=1):
+        """Raise ValueError when a frame of frame_size has no room for data, instead of sending a broken or empty message"""
+        match framing_method.lower():
+            case "character_count":
+                minimum = header_bytes + 1 # count header + 1 data byte
+            case "byte_insertion":
+                minimum = 3 # 2 flags + 1 data byte
+            case "bits_insertion":
+                minimum = 1
+            case _:
+                return
+        if frame_size < minimum:
+            raise ValueError(f"frame_size {frame_size} is too small for {framing_method}, the minimum is {minimum}")
+
+
+    def character_count_framing(self, bits_array, max_frame_size, header_bytes=1): # limit of max_frame_size is 2**(8*header_bytes)
+        """Return a list of frames, each frame is a uint8 bit array (header_bytes byte count + data bytes)"""
         frames_matrix = []
-        bytes_list = [''.join(map(str, bits_array[i:i+8])) for i in range(0, len(bits_array), 8)] # bytes list is a array of strings of 8 bits
+        bits_array = as_bits(bits_array)
+        num_bytes = len(bits_array) // 8
+        data_size = max_frame_size - header_bytes # the header matter in the frame size
 
-        while bytes_list:
-            frame_size = min(len(bytes_list), max_frame_size - 1) 
-            frame = [f"{frame_size+1:08b}"] + bytes_list[:frame_size] # +1 for the header, because the header matter in the frame size
+        for start in range(0, num_bytes, data_size): # index cursor, the data bytes are sliced once
+            frame_size = min(num_bytes - start, data_size)
+            frame = np.concatenate((int_to_bits(frame_size + header_bytes, 8*header_bytes), bits_array[start*8:(start + frame_size)*8]))
             frames_matrix.append(frame)
-            bytes_list = bytes_list[frame_size:]
 
         return frames_matrix
+
+
+    def count_header(self, byte_count, header_bytes=1):
+        """Byte count header of a character count frame: data bytes + the count header + the padding header"""
+        frame_size = byte_count + header_bytes + 1
+        if frame_size > 2**(8*header_bytes) - 1: # largest count the header holds
+            raise ValueError(f"frame of {frame_size} bytes doesn't fit a {header_bytes} byte count header, use a smaller frame_size or a wider header")
+        return int_to_bits(frame_size, 8*header_bytes)
     
 
     def bytes_insertion_framing(self, bits_array, max_frame_size): # max_frame_size is the number of ****bytes**** in a frame
-        """Return a matrix of frames, each frame is a list of strings of 8 bits"""
+        """Return a list of frames, each frame is a uint8 bit array (flag + data bytes + flag)"""
         frames_matrix = []
-        bytes_list = [''.join(map(str, bits_array[i:i+8])) for i in range(0, len(bits_array), 8)] # Bytes list is a array of strings of 8 bits
-        byte_flag = "01111110"
+        bits_array = as_bits(bits_array)
+        num_bytes = len(bits_array) // 8
+        data_size = max_frame_size - 2 # -2 for the flags
+        byte_flag = int_to_bits(0b01111110)
 
-        while bytes_list:
-            frame_size = min(len(bytes_list), max_frame_size-2)  # -2 for the flags
-            frame = [byte_flag] + bytes_list[:frame_size] + [byte_flag]
+        for start in range(0, num_bytes, data_size):
+            frame = np.concatenate((byte_flag, bits_array[start*8:(start + data_size)*8], byte_flag))
             frames_matrix.append(frame)
-            bytes_list = bytes_list[frame_size:]
             
         return frames_matrix 
     
 
-    def bits_insertion_framing(self, bits_array, max_frame_size): # max_frame_size is the number of ****bits**** in a frame
-        """Return a list of frames, each frame is a string of bits"""
-        frames_list = []
-        flag = "01111110"
+    def byte_stuffing(self, bits_array):
+        """Escape the payload bytes equal to the flag (0x7E) or to the escape (0x7D): 0x7D followed by the byte XOR 0x20 (PPP)"""
+        bytes_values = np.packbits(as_bits(bits_array))
+        escape = (bytes_values == 0x7E) | (bytes_values == 0x7D)
 
-        for i in range(0, len(bits_array), max_frame_size):
-            frame = ''.join(map(str, bits_array[i:i+max_frame_size]))
-            frames_list.append(flag + frame + flag)
-
-        return frames_list
-    
-
-# Framing methods end ---------------------------------------------------------------------------------------------------------------------
-    
+        escaped = bytes_values ^ (escape * np.uint8(0x20)) # XOR 0x20 only where an escape is needed
+        escaped = np.insert(escaped, np.flatnonzero(escape), np.uint8(0x7D)) # 0x7D before each of them
 
+        return np.unpackbits(escaped)
 
 
-# Error correction or detection methods start ---------------------------------------------------------------------------------------------------------------------
-
-    def add_even_parity_bit(self, bits_array):
-        count_ones = sum(bits_array)
-        parity_bit = 0
+    def byte_stuffing_frame(self, frame):
+        """Escape everything between the opening and the closing flag"""
+        return np.concatenate((frame[:8], self.byte_stuffing(frame[8:-8]), frame[-8:]))
 
-        if count_ones % 2 != 0:
-            parity_bit = 1
 
-        return bits_array + [parity_bit]
-    
-
-
-    def crc32(self, bit_array):
-        inserted_bits_len = 0
-
-        crc32_polynomial = 0x104C11DB7 # polynomial used by CRC32 IEEE 802 (0x04C11DB7 without the occlusion of the first bit)
-        crc32_polynomial_str = f"{crc32_polynomial:033b}" # 32 0's to complete the 96 bits
-
-        def xor(bit_str_a, bit_str_b): # xor between two bit strings
-            bit_str_result = ''
-            for i in range(len(bit_str_a)):
-                if bit_str_a[i] == bit_str_b[i]: # if the bits are equal, the result is 0
-                    bit_str_result += '0'
-                else: # if the bits are different, the result is 1
-                    bit_str_result += '1'
-            return bit_str_result
-
-        def gen_0_1_sequence(len_array): # generate a sequence of 0's and 1's
-            array = []
-            for i in range(len_array):
-                if i % 2 == 0: # if the index is even, the bit is 0
-                    array.append(0)
-                else: # if the index is odd, the bit is 1
-                    array.append(1)
-            return array
-
-        if len(bit_array) < 64: # if the bit array is less than 64 bits, complete with 0's and 1's (to avoid large sequences of 0's)
-            inserted_int_bits = gen_0_1_sequence(64 - len(bit_array)) # 0's and 1's to complete the 64 bits
-            bit_array = bit_array + inserted_int_bits
-            inserted_bits_len = len(inserted_int_bits)
-
-        bit_str = ''.join(map(str, bit_array)) # convert the bit array to a bit string
-        bit_str_initial = bit_str
+    def bits_insertion_framing(self, bits_array, max_frame_size): # max_frame_size is the number of ****bits**** in a frame
+        """Return a list of frames, each frame is a uint8 bit array"""
+        frames_list = []
+        bits_array = as_bits(bits_array)
+        flag = int_to_bits(0b01111110)
 
-        bit_str = bit_str + '0'*32 # 32 0's to complete the 96 bits     
-        bit_str_to_xor = ''
-        for i in range(len(bit_str)): # for each bit in the bit string
-            if i <= 32: # if the bit is in the first 32 bits
-                bit_str_to_xor += bit_str[i]
-            else: # if the bit is in the last 64 bits
-                if bit_str_to_xor[0] == '1':
-                    bit_str_to_xor = xor(bit_str_to_xor, crc32_polynomial_str) # xor with the polynomial
-                    bit_str_to_xor = bit_str_to_xor[1:] + bit_str[i] # exclude the first bit (0) and include the next bit
-                else:
-                    bit_str_to_xor = bit_str_to_xor[1:] + bit_str[i] # exclude the first bit (0) and include the next bit
+        for i in range(0, len(bits_array), max_frame_size):
+            frame = bits_array[i:i+max_frame_size]
+            frames_list.append(np.concatenate((flag, frame, flag)))
 
-            if i == len(bit_str) - 1: # if it is the last bit
-                if bit_str_to_xor[0] == '1': # if the first bit is 1, xor with the polynomial
-                    bit_str_to_xor = xor(bit_str_to_xor, crc32_polynomial_str)
-                    bit_str_to_xor = bit_str_to_xor[1:] # exclude the first bit (0)
+        return frames_list
 
-                else: # if the first bit is 0, xor with 33 0's
-                    bit_str_to_xor = bit_str_to_xor[1:] # exclude the first bit (0)
 
-        return list(bit_str_initial + bit_str_to_xor), inserted_bits_len
+    def bit_stuffing(self, bits_array):
+        """Insert a 0 after every five consecutive 1's (HDLC), so the data never contains the flag 01111110"""
+        bits_array = as_bits(bits_array)
+        starts, lengths = runs_of_ones(bits_array)
 
+        stuffed_per_run = lengths // 5 # a run of L ones gets a 0 after the 5th, 10th, ... one
+        run_index = np.repeat(np.arange(len(starts)), stuffed_per_run)
+        nth_in_run = np.arange(len(run_index)) - np.repeat(np.cumsum(stuffed_per_run) - stuffed_per_run, stuffed_per_run) # 0, 1, ... inside each run
+        positions = starts[run_index] + (nth_in_run + 1) * 5 # index right after the 5th, 10th, ... one
 
+        return np.insert(bits_array, positions, np.uint8(0))
 
-    def apply_hamming_code(self, bit_array): # Apply the Hamming Code to the provided bit array.
-        def find_len_redundant_bits(len_bits): 
-            """Find the number of redundant bits required for a message of length len_bits."""
-            for i in range(len_bits):
-                if(2**i >= len_bits + i + 1):
-                    return i			
-                
-        def insert_zeros_parity_position(bit_array): 
-            """Insert zeros in the parity positions."""
-            len_redudant_bits = find_len_redundant_bits(len(bit_array))
 
-            for i in range(len_redudant_bits):
-                bit_array.insert((2**i)-1, 0)
+    def bit_stuffing_frame(self, frame):
+        """Stuff everything between the opening and the closing flag"""
+        return np.concatenate((frame[:8], self.bit_stuffing(frame[8:-8]), frame[-8:]))
+    
 
-            return bit_array		
+# Framing methods end ---------------------------------------------------------------------------------------------------------------------
+    
 
-        def calculate_parity_bit(bit_array, position): # position must be one of the power of 2 (1, 2, 4, 8, 16, ...)
-            """Calculate the parity bit for the given position."""
-            temp_bit_array = bit_array[position-1:]
-            list_of_bits = []
-            jump = False # jump must be started with False to collect the first bits of the bit_array according to the position
-            for i in range(0, len(bit_array), position):
-                if jump:
-                    jump = False
-                    continue
 
-                list_of_bits.extend(temp_bit_array[i:i+position]) # if i+position is greater than the length of the temp_bit_array, it will not be a problem because the slice will be until the end of the list
-                jump = True        
 
-            parity = list_of_bits[1] # The first bit is the parity bit itself
-            list_of_bits = list_of_bits[2:] # Remove the first bit because it is the 0 that was included
+# Error correction or detection methods start ---------------------------------------------------------------------------------------------------------------------
 
-            for bit in list_of_bits:
-                parity ^= bit
+    def crc32_padding(self, bit_array):
+        """Return the bit array completed to 64 bits and the number of bits inserted"""
+        bit_array = as_bits(bit_array)
+        inserted_bits_len = 0
 
-            return parity				
+        if len(bit_array) < 64: # if the bit array is less than 64 bits, complete with 0's and 1's (to avoid large sequences of 0's)
+            inserted_int_bits = np.arange(64 - len(bit_array), dtype=np.uint8) % 2 # 0's and 1's to complete the 64 bits
+            bit_array = np.concatenate((bit_array, inserted_int_bits))
+            inserted_bits_len = len(inserted_int_bits)
 
-        def insert_parity_bits(bit_array):
-            """Return the bit array with the parity bits."""
-            len_redudant_bits = find_len_redundant_bits(len(bit_array))
-            bit_array = insert_zeros_parity_position(bit_array)
+        return bit_array, inserted_bits_len
 
-            for i in range(len_redudant_bits):
-                position = (2**i)
-                bit_array[position-1] = calculate_parity_bit(bit_array, position) # position-1 because the list starts with index 0
 
-            return bit_array
-        
-        return insert_parity_bits(bit_array)
+    def apply_hamming_code(self, bit_array, hamming_code="15,11"): # Apply the Hamming Code to the provided bit array.
+        """Return the code words of the bit array, split in blocks of the chosen code"""
+        return HAMMING_CODES[hamming_code].encode(bit_array)
 
 # Error correction or detection methods end ---------------------------------------------------------------------------------------------------------------------
 
@@ -488,91 +391,104 @@ class Transmissor:
 
 # Modulation methods start ---------------------------------------------------------------------------------------------------------------------
 
-    def ASK(self, A, f, bit_array):
-        tam_sinal = len(bit_array)
-        sinal = np.zeros(tam_sinal*100, dtype=float)
-
-        for i in range(tam_sinal):
-            if self.bits_codificados_binario[i] == 1:
-                for j in range(100):
-                    sinal[i*100 + j] = A * np.sin(2*np.pi*f*j/100)
-            else:
-                for j in range(100):
-                    sinal[i*100 + j] = 0
-
-        return sinal
-
-    
-    def FSK(self, A, f1, f2, bit_array):
-        """ Modular a frequência do sinal """
-        tam_sinal = len(bit_array)
-        sinal = np.zeros(tam_sinal*100, dtype=float)
-
-        for i in range(tam_sinal):
-            if bit_array[i] == 1:
-                for j in range(100):
-                    sinal[i*100 + j] = A * np.sin(2*np.pi*f1*j/100)
-            else:
-                for j in range(100):
-                    sinal[i*100 + j] = A * np.sin(2*np.pi*f2*j/100)
-
-        return sinal
-
-
+    @classmethod
+    def modulation_settings(cls, modulation_params=None):
+        """ modulation_defaults updated with modulation_params: A (amplitude), f1 (ASK carrier and FSK bit 1),
+        f2 (FSK bit 0) and samples_per_symbol (one bit for ASK/FSK, three for 8-QAM) """
+        unknown = set(modulation_params or {}) - set(cls.modulation_defaults)
+        if unknown:
+            raise ValueError(f"unknown modulation parameters {sorted(unknown)}, choose from {list(cls.modulation_defaults)}")
+        return {**cls.modulation_defaults, **(modulation_params or {})}
 
 
-    def ASK(self, A, f, bit_array): # Amplitude Shift Keying
-        len_signal = len(bit_array)
-        signal = np.zeros(len_signal*100, dtype=float)
+    @staticmethod
+    def carrier(A, f, samples_per_bit=100):
+        """ One bit period of the carrier A*sin(2*pi*f*t), sampled samples_per_bit times """
+        return A * np.sin(2*np.pi*f*np.arange(samples_per_bit)/samples_per_bit)
 
-        for i in range(len_signal):
-            if bit_array[i] == 1:
-                for j in range(100):
-                    signal[i*100 + j] = A * np.sin(2*np.pi*f*j/100)
-            else:
-                for j in range(100):
-                    signal[i*100 + j] = 0
 
-        return signal
+    def ASK(self, A, f, bit_array, samples_per_bit=100): # Amplitude Shift Keying
+        carriers = np.stack((np.zeros(samples_per_bit), self.carrier(A, f, samples_per_bit))) # row 0 -> bit 0 (no signal); row 1 -> bit 1
+        return carriers[as_bits(bit_array)].ravel() # one carrier period per bit
 
 
-    def FSK(self, A, f1, f2, bit_array): # Frequency Shift Keying
-        len_signal = len(bit_array)
-        signal = np.zeros(len_signal*100, dtype=float)
+    def FSK(self, A, f1, f2, bit_array, samples_per_bit=100): # Frequency Shift Keying
+        carriers = np.stack((self.carrier(A, f2, samples_per_bit), self.carrier(A, f1, samples_per_bit))) # row 0 -> bit 0 (f2); row 1 -> bit 1 (f1)
+        return carriers[as_bits(bit_array)].ravel()
 
-        for i in range(len_signal):
-            if bit_array[i] == 1:
-                for j in range(100):
-                    signal[i*100 + j] = A * np.sin(2*np.pi*f1*j/100)
-            else:
-                for j in range(100):
-                    signal[i*100 + j] = A * np.sin(2*np.pi*f2*j/100)
-
-        return signal
-
-    def modulacao_8qam(self, bits):
-        mod_8qam = Mod_8qam()
+    def modulacao_8qam(self, bits, samples_per_symbol=100):
+        mod_8qam = Mod_8qam(samples_per_symbol)
         bauds, tempo, sinal_banda_base = mod_8qam.run(bits)
         return [bauds, tempo, sinal_banda_base]
 
 # Modulation methods end ---------------------------------------------------------------------------------------------------------------------
 
     # Send digitally encoded message to receiver through socket
-    def send_message(self, bits_vector_str):
+    def send_message(self, bits_vector):
+        if self.session_socket is not None: # pipelined over the open session, only waits when the window is full
+            return self.send_pipelined(bits_vector)
 
         socket_client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         socket_client.connect((self.host, self.port))
 
-        dados = pickle.dumps(bits_vector_str)
-        socket_client.send(dados)
+        protocol.send_message(socket_client, bits_vector, 0, *getattr(self, 'schemes', ())) # header + bits packed 8 per byte
 
-        received_data = socket_client.recv(4096)
+        received_data = protocol.recv_message(socket_client) # ack with the number of bits received
 
         socket_client.close()
 
         return received_data
 
 
+    # Session mode: one connection for many messages, up to self.window messages without ack
+    def open_session(self, window=8):
+        self.session_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.session_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) # small messages go out right away
+        self.session_socket.connect((self.host, self.port))
+        self.window = window
+        self.next_sequence = 0
+        self.unacked.clear()
+
+
+    def send_pipelined(self, bits_vector):
+        """ Sends one message on the session, returns the acks that had to be read to make room in the window """
+        acks = []
+        while len(self.unacked) >= self.window:
+            acks.append(self.wait_ack())
+
+        sequence = self.next_sequence
+        protocol.send_message(self.session_socket, bits_vector, sequence, *getattr(self, 'schemes', ()))
+        self.unacked.append(sequence)
+        self.next_sequence = (sequence + 1) & 0xFFFFFFFF
+        return acks
+
+
+    def send_stream(self, messages):
+        """ Streams many bit vectors (for example frames) back to back on the session """
+        acks = []
+        for bits_vector in messages:
+            acks.extend(self.send_pipelined(bits_vector))
+        return acks
+
+
+    def wait_ack(self):
+        ack = protocol.recv_message(self.session_socket)
+        expected = self.unacked.popleft()
+        if ack.msg_type != protocol.MSG_ACK or ack.sequence != expected:
+            raise protocol.ProtocolError(f"expected ack {expected}, received type {ack.msg_type} sequence {ack.sequence}")
+        return ack
+
+
+    def close_session(self):
+        """ Waits for the pending acks and closes the connection """
+        acks = []
+        while self.unacked:
+            acks.append(self.wait_ack())
+        self.session_socket.close()
+        self.session_socket = None
+        return acks
+
+
 if __name__ == "__main__":
     transmissor = Transmissor("yan")
     result = transmissor.run("manchester", "bits_insertion", "even_parity", "ask")